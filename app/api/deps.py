@@ -1,51 +1,161 @@
-from typing import Type
+import math
+import time
+from hashlib import blake2b
+from typing import Callable, Optional, Set, Type
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.security import verify_password
-from app.db.session import get_db
+from app.core.security import password_hasher
+from app.db.changes import on_change
+from app.db.session import get_db, get_read_db
 from app.models.user import User
+from app.schemas.fieldsets import Fieldset, parse_fieldset
 from app.schemas.token import TokenPayload
+from app.schemas.user import Principal
+from app.services.rate_limit import rate_limiter
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+# Token hash -> verified payload, and user ID -> Principal
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
-def get_current_user(
-        db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> Type[User]:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+
+def _evict_principals(user_ids: Optional[Set[str]]) -> None:
+    if user_ids is None:
+        principal_cache.clear()
+    else:
+        for user_id in user_ids:
+            principal_cache.delete(user_id)
+
+
+on_change(User.__tablename__, _evict_principals)
+
+
+def decode_token(token: str) -> TokenPayload:
+    """
+    Verify a JWT and return its payload, skipping the signature check for
+    tokens seen recently. Expiry is still checked on every call.
+    """
+    key = blake2b(token.encode(), digest_size=16).digest()
+    token_data = token_cache.get(key)
+    if token_data is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         token_data = TokenPayload(**payload)
+        ttl = token_data.exp - time.time() if token_data.exp is not None else None
+        token_cache.set(key, token_data, ttl=ttl)
+    elif token_data.exp is not None and token_data.exp <= time.time():
+        token_cache.delete(key)
+        raise JWTError("Signature has expired.")
+    return token_data
+
+
+async def get_current_user(
+        db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> Principal:
+    try:
+        token_data = decode_token(token)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Не удалось проверить учетные данные",
         )
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
+
+    async def load() -> Optional[Principal]:
+        result = await db.execute(
+            select(User.id, User.is_active, User.is_superuser)
+            .where(User.id == token_data.sub)
+        )
+        row = result.first()
+        if not row:
+            return None
+        return Principal(
+            id=row.id, is_active=bool(row.is_active), is_superuser=bool(row.is_superuser)
+        )
+
+    principal = await principal_cache.get_or_load(token_data.sub, load)
+    if not principal:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    return user
+    return principal
 
 
-def get_current_active_user(
-        current_user: User = Depends(get_current_user),
-) -> User:
+async def get_current_active_user(
+        current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Неактивный пользователь")
     return current_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Type[User] | None:
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User | None:
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if not user:
         return None
-    if not verify_password(password, str(user.hashed_password)):
+    if not await password_hasher.verify(password, str(user.hashed_password)):
         return None
     return user
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+
+def rate_limit_by_ip(name: str, policy: str) -> Callable:
+    """
+    Dependency limiting a route to `policy` requests per client address.
+    """
+    async def check_rate_limit(request: Request) -> None:
+        client = request.client.host if request.client else "unknown"
+        retry_after = await rate_limiter.check(name, policy, client)
+        if retry_after:
+            raise _too_many_requests(retry_after)
+
+    return check_rate_limit
+
+
+def rate_limit_by_user(name: str, policy: str) -> Callable:
+    """
+    Dependency limiting a route to `policy` requests per authenticated user.
+    """
+    async def check_rate_limit(
+            current_user: Principal = Depends(get_current_active_user),
+    ) -> None:
+        retry_after = await rate_limiter.check(name, policy, current_user.id)
+        if retry_after:
+            raise _too_many_requests(retry_after)
+
+    return check_rate_limit
+
+
+def fieldset(schema: Type[BaseModel]) -> Callable:
+    """
+    Dependency parsing the `fields` query parameter against `schema`: the
+    fields to load and return, or None for all of them.
+    """
+    async def parse_fields(
+            fields: Optional[str] = Query(
+                None, description="Comma-separated fields to return (default: all)"
+            ),
+    ) -> Optional[Fieldset]:
+        try:
+            return parse_fieldset(schema, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return parse_fields
@@ -0,0 +1,190 @@
+import asyncio
+from hashlib import sha256
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from jose import JWTError
+from pydantic import ValidationError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from app.api.deps import decode_token
+from app.core.config import settings
+from app.services.idempotency import claim_key, release_key, store_response
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Responses telling the client to come back later rather than an outcome:
+# a retry with the same key runs the request again
+_NOT_STORED = {401, 403, 408, 429}
+_MAX_KEY_LENGTH = 255
+
+
+def _owner(headers: Headers) -> Optional[str]:
+    """
+    Whose keyspace the request's key lives in: the authenticated user, ""
+    for anonymous requests (see `_anonymous_owner`), or None when the token
+    is no good (the route rejects those anyway).
+    """
+    authorization = headers.get("authorization")
+    if not authorization:
+        return ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        return decode_token(token).sub
+    except (JWTError, ValidationError):
+        return None
+
+
+def _anonymous_owner(scope: Scope, request_hash: str) -> str:
+    """
+    Anonymous clients have no identity to keep their keys apart, so their
+    keyspace is the client address and the request itself: a key is only
+    ever replayed to the same request from the same address.
+    """
+    client = scope.get("client")
+    host = client[0] if client else ""
+    return "anonymous:" + sha256(f"{host}\n{request_hash}".encode()).hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Makes POSTs to `paths` sent with an Idempotency-Key header run at most
+    once per (user, key). Anonymous keys are scoped to the client address
+    and request.
+
+    The first request claims the key and runs; its response is stored and
+    replayed (with Idempotent-Replayed: true) to every retry of the same
+    request for IDEMPOTENCY_TTL_SECONDS. A retry arriving while the first
+    is still running waits for its response. Reusing a key for a different
+    request is rejected with 422. Server errors aren't stored, so a retry
+    after one runs the request again.
+    """
+
+    def __init__(self, app: Any, paths: Iterable[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+                scope["type"] != "http"
+                or scope["method"] != "POST"
+                or scope["path"] not in self.paths
+        ):
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        owner = _owner(headers)
+        if key is None or owner is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > _MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)
+            return await response(scope, receive, send)
+
+        body = await self._read_body(receive)
+        request_hash = sha256(
+            b"\n".join((scope["path"].encode(), scope["query_string"], body))
+        ).hexdigest()
+        if not owner:
+            owner = _anonymous_owner(scope, request_hash)
+        claim = await self._claim(scope, receive, send, owner, key, request_hash)
+        if claim is None:
+            return
+
+        sent_body = False
+
+        async def replay_receive() -> Dict[str, Any]:
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start: Dict[str, Any] = {}
+        chunks = []
+
+        async def capture_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await asyncio.shield(release_key(owner, key, claim))
+            raise
+        status_code = start.get("status", 500)
+        if status_code >= 500 or status_code in _NOT_STORED:
+            await release_key(owner, key, claim)
+        else:
+            content_type = Headers(raw=start.get("headers", [])).get(
+                "content-type", "application/json"
+            )
+            await store_response(owner, key, claim, status_code, content_type, b"".join(chunks))
+
+    async def _claim(
+            self,
+            scope: Scope,
+            receive: Receive,
+            send: Send,
+            owner: str,
+            key: str,
+            request_hash: str
+    ) -> Optional[str]:
+        """
+        Claim the key, or answer the request from its record (replaying
+        the stored response or reporting a conflict) and return None.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        delay = 0.01
+        while True:
+            claim, record = await claim_key(
+                owner,
+                key,
+                request_hash,
+                lock=settings.IDEMPOTENCY_LOCK_SECONDS,
+                ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+            )
+            if claim is not None:
+                return claim
+            if record.request_hash != request_hash:
+                response = JSONResponse(
+                    {"detail": "Idempotency-Key already used for a different request"},
+                    status_code=422,
+                )
+                break
+            if record.status_code is not None:
+                response = Response(
+                    record.body,
+                    status_code=record.status_code,
+                    media_type=record.content_type,
+                    headers={"Idempotent-Replayed": "true"},
+                )
+                break
+            if loop.time() >= deadline:
+                response = JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is in progress"},
+                    status_code=409,
+                    headers={"Retry-After": "1"},
+                )
+                break
+            # In flight elsewhere: poll for its outcome
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+        await response(scope, receive, send)
+        return None
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
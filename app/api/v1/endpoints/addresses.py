@@ -1,83 +1,113 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.config import settings
+from app.core.serialization import ResponseAdapter
 from app.crud import crud_address
+from app.crud.pagination import InvalidCursorError
+from app.schemas.common import Page
 from app.schemas.address import Address, AddressCreate, AddressUpdate
-from app.schemas.user import User
+from app.schemas.user import Principal
 from app.api.deps import get_current_active_user
 
 router = APIRouter()
 
+ADDRESS_PAGE = ResponseAdapter(Page[Address])
+ADDRESS_LIST = ResponseAdapter(List[Address])
 
-@router.get("/", response_model=List[Address])
-def read_addresses(
-        db: Session = Depends(deps.get_db),
-        skip: int = 0,
-        limit: int = 100,
-        current_user: User = Depends(get_current_active_user),
+
+@router.get("/", response_model=Page[Address])
+async def read_addresses(
+        db: AsyncSession = Depends(deps.get_read_db),
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=settings.PAGE_MAX_LIMIT),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Retrieve addresses for current user.
     """
-    if crud_address.is_admin(current_user):
-        addresses = crud_address.get_multi(db, skip=skip, limit=limit)
-    else:
-        addresses = crud_address.get_multi_by_user(
-            db=db, user_id=current_user.id, skip=skip, limit=limit
-        )
-    return addresses
+    try:
+        if crud_address.is_admin(current_user):
+            addresses, next_cursor = await crud_address.get_multi(
+                db, cursor=cursor, limit=limit
+            )
+        else:
+            addresses, next_cursor = await crud_address.get_multi_by_user(
+                db=db, user_id=current_user.id, cursor=cursor, limit=limit
+            )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ADDRESS_PAGE.response({"items": addresses, "next_cursor": next_cursor})
 
 
 @router.post("/", response_model=Address)
-def create_address(
+async def create_address(
         *,
-        db: Session = Depends(deps.get_db),
+        db: AsyncSession = Depends(deps.get_db),
         address_in: AddressCreate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Create new address.
     """
-    address = crud_address.create_with_user(
+    address = await crud_address.create_with_user(
         db=db, obj_in=address_in, user_id=current_user.id
     )
     return address
 
 
 @router.put("/{address_id}", response_model=Address)
-def update_address(
+async def update_address(
         *,
-        db: Session = Depends(deps.get_db),
-        address_id: int,
+        db: AsyncSession = Depends(deps.get_db),
+        address_id: str,
         address_in: AddressUpdate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Update an address.
     """
-    address = crud_address.get(db, id=address_id)
+    address = await crud_address.get(db, id=address_id)
     if not address:
         raise HTTPException(status_code=404, detail="Address not found")
     if address.user_id != current_user.id and not crud_address.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    address = crud_address.update(db, db_obj=address, obj_in=address_in)
+    address = await crud_address.update(db, db_obj=address, obj_in=address_in)
     return address
 
 
+@router.get("/batch", response_model=List[Address])
+async def read_addresses_batch(
+        ids: List[str] = Query(..., max_length=settings.MULTI_GET_MAX_IDS),
+        db: AsyncSession = Depends(deps.get_read_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get several addresses by ID, in the order asked for. Unknown IDs are
+    left out.
+    """
+    addresses = await crud_address.load_many(db, ids=ids)
+    if not crud_address.is_admin(current_user) and any(
+            address.user_id != current_user.id for address in addresses
+    ):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return ADDRESS_LIST.response(addresses)
+
+
 @router.get("/{address_id}", response_model=Address)
-def read_address(
+async def read_address(
         *,
-        db: Session = Depends(deps.get_db),
-        address_id: int,
-        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(deps.get_read_db),
+        address_id: str,
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Get address by ID.
     """
-    address = crud_address.get(db, id=address_id)
+    address = await crud_address.get(db, id=address_id)
     if not address:
         raise HTTPException(status_code=404, detail="Address not found")
     if address.user_id != current_user.id and not crud_address.is_admin(current_user):
@@ -86,19 +116,19 @@ def read_address(
 
 
 @router.delete("/{address_id}", response_model=Address)
-def delete_address(
+async def delete_address(
         *,
-        db: Session = Depends(deps.get_db),
-        address_id: int,
-        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(deps.get_db),
+        address_id: str,
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Delete an address.
     """
-    address = crud_address.get(db, id=address_id)
+    address = await crud_address.get(db, id=address_id)
     if not address:
         raise HTTPException(status_code=404, detail="Address not found")
     if address.user_id != current_user.id and not crud_address.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    address = crud_address.remove(db=db, id=address_id)
+    address = await crud_address.remove(db=db, id=address_id)
     return address
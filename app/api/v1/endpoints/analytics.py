@@ -0,0 +1,74 @@
+from datetime import date
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.crud import crud_order
+from app.models.order import OrderStatus
+from app.schemas.order import DailySales, ProductSales, StatusSales
+from app.schemas.user import Principal
+from app.api.deps import get_current_active_user
+
+router = APIRouter()
+
+
+def _check_range(date_from: date, date_to: date) -> None:
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+
+
+@router.get("/sales/daily", response_model=List[DailySales])
+async def read_daily_sales(
+        date_from: date,
+        date_to: date,
+        status: Optional[List[OrderStatus]] = Query(None),
+        db: AsyncSession = Depends(deps.get_read_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Orders, revenue and items sold per day between two dates (inclusive).
+    """
+    if not crud_order.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    _check_range(date_from, date_to)
+    return await crud_order.get_daily_sales(
+        db, date_from=date_from, date_to=date_to, statuses=status or ()
+    )
+
+
+@router.get("/sales/statuses", response_model=List[StatusSales])
+async def read_status_sales(
+        date_from: date,
+        date_to: date,
+        db: AsyncSession = Depends(deps.get_read_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Orders, revenue and items sold per order status between two dates.
+    """
+    if not crud_order.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    _check_range(date_from, date_to)
+    return await crud_order.get_status_sales(db, date_from=date_from, date_to=date_to)
+
+
+@router.get("/sales/products", response_model=List[ProductSales])
+async def read_product_sales(
+        date_from: date,
+        date_to: date,
+        status: Optional[List[OrderStatus]] = Query(None),
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(deps.get_read_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    The products with the highest revenue between two dates.
+    """
+    if not crud_order.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    _check_range(date_from, date_to)
+    return await crud_order.get_product_sales(
+        db, date_from=date_from, date_to=date_to, statuses=status or (), limit=limit
+    )
@@ -0,0 +1,41 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.core.security import HashingQueueFull, create_access_token
+from app.crud import crud_user
+from app.schemas.token import Token
+
+router = APIRouter()
+
+
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[Depends(deps.rate_limit_by_ip("login", settings.RATE_LIMIT_LOGIN))],
+)
+async def login(
+        db: AsyncSession = Depends(deps.get_db),
+        form_data: OAuth2PasswordRequestForm = Depends(),
+) -> Any:
+    """
+    OAuth2 password login, returning a bearer access token.
+    """
+    try:
+        user = await crud_user.authenticate(
+            db, email=form_data.username, password=form_data.password
+        )
+    except HashingQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Too many logins, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if not crud_user.is_active(user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return Token(access_token=create_access_token(user.id))
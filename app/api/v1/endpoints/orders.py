@@ -1,106 +1,256 @@
-from typing import Any, List
+from datetime import datetime
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.config import settings
+from app.core.serialization import ResponseAdapter
+from app.core.sse import EventStreamResponse
 from app.crud import crud_order
-from app.schemas.order import Order, OrderCreate, OrderUpdate
-from app.schemas.user import User
+from app.crud.product import InsufficientStockError
+from app.crud.pagination import InvalidCursorError
+from app.schemas.common import Page
+from app.schemas.fieldsets import Fieldset
+from app.models.order import OrderStatus
+from app.schemas.order import Order, OrderCreate, OrderExportFormat, OrderUpdate
+from app.schemas.user import Principal
 from app.api.deps import get_current_active_user
+from app.services.order_events import load_snapshot, stream_events
+from app.services.order_export import MEDIA_TYPES, encode_orders
 from app.services.order_service import OrderService
 
 router = APIRouter()
 
+ORDER_PAGE = ResponseAdapter(Page[Order])
+ORDER_LIST = ResponseAdapter(List[Order])
 
-@router.get("/", response_model=List[Order])
-def read_orders(
-        db: Session = Depends(deps.get_db),
-        skip: int = 0,
-        limit: int = 100,
-        current_user: User = Depends(get_current_active_user),
+
+@router.get("/", response_model=Page[Order])
+async def read_orders(
+        db: AsyncSession = Depends(deps.get_read_db),
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=settings.PAGE_MAX_LIMIT),
+        fieldset: Optional[Fieldset] = Depends(deps.fieldset(Order)),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Retrieve orders.
+    Retrieve orders, newest first, optionally only some of their fields.
     """
-    if crud_order.is_admin(current_user):
-        orders = crud_order.get_multi(db, skip=skip, limit=limit)
+    if fieldset is None:
+        options, adapter = crud_order.items_options, ORDER_PAGE
     else:
-        orders = crud_order.get_multi_by_user(
-            db=db, user_id=current_user.id, skip=skip, limit=limit
-        )
-    return orders
+        options, adapter = crud_order.fields_options(fieldset.fields), fieldset.page
+    try:
+        if crud_order.is_admin(current_user):
+            orders, next_cursor = await crud_order.get_multi(
+                db, cursor=cursor, limit=limit, options=options
+            )
+        else:
+            orders, next_cursor = await crud_order.get_multi_by_user(
+                db=db,
+                user_id=current_user.id,
+                cursor=cursor,
+                limit=limit,
+                options=options,
+            )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return adapter.response({"items": orders, "next_cursor": next_cursor})
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+)
+async def export_orders(
+        db: AsyncSession = Depends(deps.get_read_db),
+        format: OrderExportFormat = OrderExportFormat.NDJSON,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        status: Optional[List[OrderStatus]] = Query(None),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Stream every order created in [created_from, created_to), oldest first,
+    with its items: one order per NDJSON line, or one item per CSV row.
+    """
+    if not crud_order.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    partitions = crud_order.stream_export(
+        db,
+        created_from=created_from,
+        created_to=created_to,
+        statuses=status or (),
+        batch_size=settings.ORDER_EXPORT_BATCH_SIZE,
+    )
+    return StreamingResponse(
+        encode_orders(partitions, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format.value}"'},
+    )
 
 
-@router.post("/", response_model=Order)
-def create_order(
+@router.get("/events", response_class=EventStreamResponse)
+async def stream_my_order_events(
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Server-sent events: the status of each active order of the current user,
+    then every status change of their orders as it happens.
+    """
+    return EventStreamResponse(stream_events(
+        ("user", current_user.id),
+        lambda: load_snapshot(user_id=current_user.id),
+    ))
+
+
+@router.get("/batch", response_model=List[Order])
+async def read_orders_batch(
+        ids: List[str] = Query(..., max_length=settings.MULTI_GET_MAX_IDS),
+        db: AsyncSession = Depends(deps.get_read_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get several orders by ID, in the order asked for. Unknown IDs are left
+    out.
+    """
+    orders = await crud_order.load_many(db, ids=ids, options=crud_order.items_options)
+    if not crud_order.is_admin(current_user) and any(
+            order.user_id != current_user.id for order in orders
+    ):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return ORDER_LIST.response(orders)
+
+
+@router.post(
+    "/",
+    response_model=Order,
+    dependencies=[Depends(deps.rate_limit_by_user("orders", settings.RATE_LIMIT_ORDERS))],
+)
+async def create_order(
         *,
-        db: Session = Depends(deps.get_db),
+        db: AsyncSession = Depends(deps.get_db),
         order_in: OrderCreate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Create new order.
     """
     order_service = OrderService(db)
-    order = order_service.create_order(order_in=order_in, user_id=current_user.id)
+    try:
+        order = await order_service.create_order(
+            order_in=order_in, user_id=current_user.id
+        )
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return order
 
 
 @router.put("/{order_id}", response_model=Order)
-def update_order(
+async def update_order(
         *,
-        db: Session = Depends(deps.get_db),
-        order_id: int,
+        db: AsyncSession = Depends(deps.get_db),
+        order_id: str,
         order_in: OrderUpdate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Update an order.
+    Update an order. Only admins change its status; owners cancel with
+    DELETE.
     """
-    order = crud_order.get(db, id=order_id)
+    order = await crud_order.get(db, id=order_id, options=crud_order.items_options)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id and not crud_order.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    order = crud_order.update(db, db_obj=order, obj_in=order_in)
+    if order_in.status is not None:
+        if not crud_order.is_admin(current_user):
+            raise HTTPException(status_code=400, detail="Not enough permissions")
+        try:
+            order = await OrderService(db).update_order_status(
+                order_id=order_id, status=order_in.status
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    order_data = order_in.dict(exclude_unset=True, exclude={"status"})
+    if order_data:
+        order = await crud_order.update(db, db_obj=order, obj_in=order_data)
     return order
 
 
 @router.get("/{order_id}", response_model=Order)
-def read_order(
+async def read_order(
         *,
-        db: Session = Depends(deps.get_db),
-        order_id: int,
-        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(deps.get_read_db),
+        order_id: str,
+        fieldset: Optional[Fieldset] = Depends(deps.fieldset(Order)),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Get order by ID.
+    Get order by ID, optionally only some of its fields.
     """
-    order = crud_order.get(db, id=order_id)
+    if fieldset is None:
+        options = crud_order.items_options
+    else:
+        # The owner is needed for the permission check
+        options = crud_order.fields_options(fieldset.fields, include=("user_id",))
+    order = await crud_order.get(db, id=order_id, options=options)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id and not crud_order.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    if fieldset is not None:
+        return fieldset.item.response(order)
     return order
 
 
+@router.get("/{order_id}/events", response_class=EventStreamResponse)
+async def stream_order_events(
+        *,
+        db: AsyncSession = Depends(deps.get_db),
+        order_id: str,
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Server-sent events: the order's current status, then every change of it.
+    """
+    order = await crud_order.get(db, id=order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.user_id != current_user.id and not crud_order.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    # The stream may stay open for hours; don't hold a pooled connection
+    await db.close()
+    return EventStreamResponse(stream_events(
+        ("order", order_id), lambda: load_snapshot(order_id=order_id)
+    ))
+
+
 @router.delete("/{order_id}", response_model=Order)
-def cancel_order(
+async def cancel_order(
         *,
-        db: Session = Depends(deps.get_db),
-        order_id: int,
-        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(deps.get_db),
+        order_id: str,
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Cancel an order.
     """
-    order = crud_order.get(db, id=order_id)
+    order = await crud_order.get(db, id=order_id, options=crud_order.items_options)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id and not crud_order.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
 
     order_service = OrderService(db)
-    order = order_service.cancel_order(order_id=order_id)
+    try:
+        order = await order_service.cancel_order(order_id=order_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return order
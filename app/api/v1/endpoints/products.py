@@ -1,36 +1,124 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.config import settings
+from app.core.http_cache import cache_control, conditional_response
+from app.core.serialization import ResponseAdapter
 from app.crud import crud_product
-from app.schemas.product import Product, ProductCreate, ProductUpdate
-from app.schemas.user import User
+from app.crud.pagination import InvalidCursorError
+from app.schemas.common import Page
+from app.schemas.fieldsets import Fieldset
+from app.schemas.product import (
+    CategoryFacet, Product, ProductCreate, ProductImportKey, ProductImportResult, ProductSuggestion,
+    ProductUpdate
+)
+from app.schemas.user import Principal
 from app.api.deps import get_current_active_user
+from app.services.autocomplete import autocomplete_index
+from app.services.catalog_cache import catalog_cache
+from app.services.product_import import ProductImportService
 
 router = APIRouter()
 
+PRODUCT_PAGE = ResponseAdapter(Page[Product])
 
-@router.get("/", response_model=List[Product])
-def read_products(
-        db: Session = Depends(deps.get_db),
-        skip: int = 0,
-        limit: int = 100,
+CATALOG_CACHE_CONTROL = cache_control(
+    settings.CATALOG_MAX_AGE_SECONDS, settings.CATALOG_STALE_WHILE_REVALIDATE_SECONDS
+)
+
+
+@router.get("/", response_model=Page[Product], responses={304: {}})
+async def read_products(
+        request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=settings.PAGE_MAX_LIMIT),
+        category: Optional[str] = None,
+        fieldset: Optional[Fieldset] = Depends(deps.fieldset(Product)),
+) -> Any:
+    """
+    Retrieve products, optionally of a single category and only some of
+    their fields.
+
+    Supports If-None-Match; cached pages are answered without a query.
+    """
+    try:
+        page = await catalog_cache.get_page(
+            cursor=cursor, limit=limit, category=category, fieldset=fieldset
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return conditional_response(request, page, CATALOG_CACHE_CONTROL)
+
+
+@router.get("/search", response_model=Page[Product])
+async def search_products(
+        db: AsyncSession = Depends(deps.get_read_db),
+        q: str = Query(..., min_length=1),
+        category: Optional[str] = None,
+        is_available: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
 ) -> Any:
     """
-    Retrieve products.
+    Search products by name and description, ranked by relevance.
     """
-    products = crud_product.get_multi(db, skip=skip, limit=limit)
-    return products
+    try:
+        products, next_cursor = await crud_product.search_products(
+            db, query=q, category=category, is_available=is_available,
+            cursor=cursor, limit=limit,
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return PRODUCT_PAGE.response({"items": products, "next_cursor": next_cursor})
+
+
+@router.get("/facets", response_model=List[CategoryFacet], responses={304: {}})
+async def read_category_facets(
+        request: Request,
+) -> Any:
+    """
+    Product, available and in-stock counts per category.
+    """
+    facets = await catalog_cache.get_facets()
+    return conditional_response(request, facets, CATALOG_CACHE_CONTROL)
+
+
+@router.get("/batch", response_model=List[Product], responses={304: {}})
+async def read_products_batch(
+        request: Request,
+        ids: List[str] = Query(..., max_length=settings.MULTI_GET_MAX_IDS),
+) -> Any:
+    """
+    Get several products by ID, in the order asked for. Unknown IDs are
+    left out.
+    """
+    products = await catalog_cache.get_products(ids)
+    return conditional_response(request, products, CATALOG_CACHE_CONTROL)
+
+
+@router.get("/suggest", response_model=List[ProductSuggestion])
+async def suggest_products(
+        q: str = Query(..., min_length=1),
+        limit: int = Query(10, le=50),
+) -> Any:
+    """
+    Autocomplete product names and categories from the in-memory index.
+    """
+    return [
+        ProductSuggestion(id=id, name=name, category=category)
+        for id, name, category in autocomplete_index.suggest(q, limit=limit)
+    ]
 
 
 @router.post("/", response_model=Product)
-def create_product(
+async def create_product(
         *,
-        db: Session = Depends(deps.get_db),
+        db: AsyncSession = Depends(deps.get_db),
         product_in: ProductCreate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Create new product.
@@ -39,59 +127,89 @@ def create_product(
         raise HTTPException(
             status_code=400, detail="Not enough permissions to create product"
         )
-    product = crud_product.create(db, obj_in=product_in)
+    product = await crud_product.create(db, obj_in=product_in)
     return product
 
 
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+        *,
+        db: AsyncSession = Depends(deps.get_db),
+        request: Request,
+        key: ProductImportKey = ProductImportKey.SKU,
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Bulk upsert products from a CSV or NDJSON body streamed by the client.
+
+    Rows are matched on `key`. Send `Content-Type: text/csv` (with a header
+    row) or `application/x-ndjson`.
+    """
+    if not crud_product.is_admin(current_user):
+        raise HTTPException(
+            status_code=400, detail="Not enough permissions to import products"
+        )
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    import_service = ProductImportService(db, key=key)
+    try:
+        result = await import_service.import_stream(request.stream(), media_type)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return result
+
+
 @router.put("/{product_id}", response_model=Product)
-def update_product(
+async def update_product(
         *,
-        db: Session = Depends(deps.get_db),
-        product_id: int,
+        db: AsyncSession = Depends(deps.get_db),
+        product_id: str,
         product_in: ProductUpdate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Update a product.
     """
-    product = crud_product.get(db, id=product_id)
+    product = await crud_product.get(db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     if not crud_product.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    product = crud_product.update(db, db_obj=product, obj_in=product_in)
+    product = await crud_product.update(db, db_obj=product, obj_in=product_in)
     return product
 
 
-@router.get("/{product_id}", response_model=Product)
-def read_product(
+@router.get("/{product_id}", response_model=Product, responses={304: {}})
+async def read_product(
         *,
-        db: Session = Depends(deps.get_db),
-        product_id: int,
+        request: Request,
+        product_id: str,
+        fieldset: Optional[Fieldset] = Depends(deps.fieldset(Product)),
 ) -> Any:
     """
-    Get product by ID.
+    Get product by ID, optionally only some of its fields.
+
+    Supports If-None-Match; cached products are answered without a query.
     """
-    product = crud_product.get(db, id=product_id)
+    product = await catalog_cache.get_product(product_id, fieldset)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return conditional_response(request, product, CATALOG_CACHE_CONTROL)
 
 
 @router.delete("/{product_id}", response_model=Product)
-def delete_product(
+async def delete_product(
         *,
-        db: Session = Depends(deps.get_db),
-        product_id: int,
-        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(deps.get_db),
+        product_id: str,
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Delete a product.
     """
-    product = crud_product.get(db, id=product_id)
+    product = await crud_product.get(db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     if not crud_product.is_admin(current_user):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    product = crud_product.remove(db=db, id=product_id)
+    product = await crud_product.remove(db=db, id=product_id)
     return product
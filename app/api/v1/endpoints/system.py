@@ -0,0 +1,96 @@
+from datetime import date
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.crud import crud_order, crud_product, crud_user
+from app.db.session import get_pool_status
+from app.schemas.system import CatalogCacheStatus, JobQueueStatus, PoolsStatus
+from app.schemas.user import Principal
+from app.api.deps import get_current_active_user
+from app.services.catalog_cache import catalog_cache
+from app.services.job_queue import get_queue_status, requeue_dead_jobs
+
+router = APIRouter()
+
+
+@router.get("/pool", response_model=PoolsStatus)
+async def read_pool_status(
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Connection pool occupancy and acquisition wait times for each database.
+    """
+    if not crud_user.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return get_pool_status()
+
+
+@router.get("/cache", response_model=CatalogCacheStatus)
+async def read_cache_status(
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Hit, miss and eviction counters of this worker's catalog cache.
+    """
+    if not crud_user.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return catalog_cache.stats()
+
+
+@router.post("/facets/rebuild", status_code=204)
+async def rebuild_category_facets(
+        db: AsyncSession = Depends(deps.get_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> None:
+    """
+    Recompute the category facets from scratch.
+    """
+    if not crud_user.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    await crud_product.rebuild_category_facets(db)
+
+
+@router.post("/sales/rebuild", status_code=204)
+async def rebuild_sales_rollups(
+        since: Optional[date] = None,
+        db: AsyncSession = Depends(deps.get_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> None:
+    """
+    Recompute the sales rollups from `since` on, or from scratch.
+    """
+    if not crud_user.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    await crud_order.rebuild_sales_rollups(db, since=since)
+    await db.commit()
+
+
+@router.get("/jobs", response_model=JobQueueStatus)
+async def read_job_queue_status(
+        db: AsyncSession = Depends(deps.get_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Background jobs per status and the wait of the oldest due one.
+    """
+    if not crud_user.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return await get_queue_status(db)
+
+
+@router.post("/jobs/requeue", status_code=204)
+async def requeue_jobs(
+        kind: Optional[str] = None,
+        db: AsyncSession = Depends(deps.get_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> None:
+    """
+    Retry the dead jobs (of `kind`, or all) with a fresh set of attempts.
+    """
+    if not crud_user.is_admin(current_user):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    await requeue_dead_jobs(db, kind=kind)
+    await db.commit()
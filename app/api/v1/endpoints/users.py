@@ -1,92 +1,149 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.config import settings
+from app.core.serialization import ResponseAdapter
+from app.core.security import HashingQueueFull
 from app.crud import crud_user
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.crud.pagination import InvalidCursorError
+from app.schemas.common import Page
+from app.schemas.fieldsets import Fieldset
+from app.schemas.user import Principal, User, UserCreate, UserUpdate
 from app.api.deps import get_current_active_user
 
 router = APIRouter()
 
-@router.get("/", response_model=List[User])
-def read_users(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
+USER_PAGE = ResponseAdapter(Page[User])
+USER_LIST = ResponseAdapter(List[User])
+
+@router.get("/", response_model=Page[User])
+async def read_users(
+    db: AsyncSession = Depends(deps.get_read_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=settings.PAGE_MAX_LIMIT),
+    fieldset: Optional[Fieldset] = Depends(deps.fieldset(User)),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Retrieve users.
+    Retrieve users, optionally only some of their fields.
     """
-    users = crud_user.get_multi(db, skip=skip, limit=limit)
-    return users
+    options = crud_user.fields_options(fieldset.fields) if fieldset else ()
+    try:
+        users, next_cursor = await crud_user.get_multi(
+            db, cursor=cursor, limit=limit, options=options
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    adapter = fieldset.page if fieldset else USER_PAGE
+    return adapter.response({"items": users, "next_cursor": next_cursor})
 
-@router.post("/", response_model=User)
-def create_user(
+@router.post(
+    "/",
+    response_model=User,
+    dependencies=[Depends(deps.rate_limit_by_ip("signup", settings.RATE_LIMIT_SIGNUP))],
+)
+async def create_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Create new user.
     """
-    user = crud_user.get_by_email(db, email=user_in.email)
+    user = await crud_user.get_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-    user = crud_user.create(db, obj_in=user_in)
+    try:
+        user = await crud_user.create(db, obj_in=user_in)
+    except HashingQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Too many requests, try again shortly",
+            headers={"Retry-After": "1"},
+        )
     return user
 
 @router.put("/me", response_model=User)
-def update_user_me(
+async def update_user_me(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Update own user.
     """
-    user = crud_user.update(db, db_obj=current_user, obj_in=user_in)
+    user = await crud_user.get(db, id=current_user.id)
+    try:
+        user = await crud_user.update(db, db_obj=user, obj_in=user_in)
+    except HashingQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Too many requests, try again shortly",
+            headers={"Retry-After": "1"},
+        )
     return user
 
 @router.get("/me", response_model=User)
-def read_user_me(
-    current_user: User = Depends(get_current_active_user),
+async def read_user_me(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Get current user.
     """
-    return current_user
+    return await crud_user.get(db, id=current_user.id)
 
-@router.get("/{user_id}", response_model=User)
-def read_user_by_id(
-    user_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(deps.get_db),
+@router.get("/batch", response_model=List[User])
+async def read_users_batch(
+    ids: List[str] = Query(..., max_length=settings.MULTI_GET_MAX_IDS),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """
-    Get a specific user by id.
+    Get several users by ID, in the order asked for. Unknown IDs are left
+    out.
     """
-    user = crud_user.get(db, id=user_id)
-    if user == current_user:
-        return user
-    if not crud_user.is_admin(current_user):
+    users = await crud_user.load_many(db, ids=ids)
+    if not crud_user.is_admin(current_user) and any(
+        user.id != current_user.id for user in users
+    ):
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
+    return USER_LIST.response(users)
+
+@router.get("/{user_id}", response_model=User)
+async def read_user_by_id(
+    user_id: str,
+    fieldset: Optional[Fieldset] = Depends(deps.fieldset(User)),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(deps.get_read_db),
+) -> Any:
+    """
+    Get a specific user by id, optionally only some of their fields.
+    """
+    options = crud_user.fields_options(fieldset.fields) if fieldset else ()
+    user = await crud_user.get(db, id=user_id, options=options)
+    if user is None or user.id != current_user.id:
+        if not crud_user.is_admin(current_user):
+            raise HTTPException(
+                status_code=400, detail="The user doesn't have enough privileges"
+            )
+    if fieldset is not None and user is not None:
+        return fieldset.item.response(user)
     return user
 
 @router.delete("/{user_id}", response_model=User)
-def delete_user(
+async def delete_user(
     *,
-    db: Session = Depends(deps.get_db),
-    user_id: int,
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(deps.get_db),
+    user_id: str,
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Delete user.
@@ -95,11 +152,11 @@ def delete_user(
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
-    user = crud_user.get(db, id=user_id)
+    user = await crud_user.get(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
-    user = crud_user.remove(db=db, id=user_id)
+    user = await crud_user.remove(db=db, id=user_id)
     return user
\ No newline at end of file
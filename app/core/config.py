@@ -1,5 +1,5 @@
 import secrets
-from typing import List, Union
+from typing import List, Optional, Union
 
 from pydantic import AnyHttpUrl, PostgresDsn, field_validator
 from pydantic_settings import BaseSettings
@@ -13,7 +13,8 @@ class Settings(BaseSettings):
     CORS_ORIGINS: List[str] = []
 
     @field_validator("CORS_ORIGINS", mode='before')
-    def assemble_cors_origins(self, v: Union[str, List[str]]) -> Union[List[str], str]:
+    @classmethod
+    def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
         if isinstance(v, str) and not v.startswith("["):
             return [i.strip() for i in v.split(",")]
         elif isinstance(v, (list, str)):
@@ -22,6 +23,104 @@ class Settings(BaseSettings):
 
     DATABASE_URL: PostgresDsn
     TEST_DATABASE_URL: PostgresDsn
+    REPLICA_DATABASE_URL: Optional[PostgresDsn] = None
+    # Reads from a client that wrote within this window are served by the primary
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # 0 disables asyncpg prepared statement caching (required behind pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool = False
+    # NOTIFY channel carrying committed entity changes between workers
+    DB_CHANGES_CHANNEL: str = "entity_changes"
+    # NOTIFY channel carrying order status changes to every worker's streams
+    ORDER_EVENTS_CHANNEL: str = "order_events"
+    # Events buffered per open stream; a client falling further behind is
+    # told to resync instead
+    ORDER_EVENTS_QUEUE_SIZE: int = 100
+    ORDER_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    # Background jobs: workers (python -m app.worker) wake up on this NOTIFY
+    # channel, or poll every JOB_POLL_INTERVAL_SECONDS for delayed retries
+    JOB_QUEUE_CHANNEL: str = "job_queue"
+    JOB_WORKER_CONCURRENCY: int = 10
+    JOB_POLL_INTERVAL_SECONDS: float = 5.0
+    # A job still running after this long is taken to have lost its worker
+    # and is handed to another one
+    JOB_LEASE_SECONDS: float = 300.0
+    # Failed jobs are retried after JOB_RETRY_BASE_SECONDS, doubling up to
+    # JOB_RETRY_MAX_SECONDS, and marked dead after JOB_MAX_ATTEMPTS attempts
+    JOB_MAX_ATTEMPTS: int = 8
+    JOB_RETRY_BASE_SECONDS: float = 5.0
+    JOB_RETRY_MAX_SECONDS: float = 3600.0
+
+    # Most IDs accepted by one multi-get (GET /<resource>/batch?ids=...)
+    MULTI_GET_MAX_IDS: int = 100
+    # Largest page a list endpoint returns (?limit=...)
+    PAGE_MAX_LIMIT: int = 500
+
+    PRODUCT_IMPORT_BATCH_SIZE: int = 5000
+    PRODUCT_IMPORT_MAX_ERRORS: int = 1000
+
+    # Rows fetched per round trip from the order export's server-side cursor
+    ORDER_EXPORT_BATCH_SIZE: int = 2000
+
+    # Periodically re-derive the sales rollups of the last
+    # SALES_RECONCILE_DAYS days (and today) from the order tables; order
+    # writes wait while it runs. An interval of 0 disables it
+    SALES_RECONCILE_INTERVAL_SECONDS: float = 3600.0
+    SALES_RECONCILE_DAYS: int = 1
+
+    # Per-worker catalog read cache; a TTL of 0 disables it
+    CATALOG_CACHE_TTL_SECONDS: float = 30.0
+    CATALOG_CACHE_MAX_PRODUCTS: int = 10000
+    CATALOG_CACHE_MAX_PAGES: int = 1000
+    # Cache misses are read from the primary: invalidations arrive as soon
+    # as a change commits, and a lagging replica would put the old data
+    # back for a whole TTL. Reading them from the replica offloads the
+    # primary at the cost of that staleness
+    CATALOG_CACHE_FROM_REPLICA: bool = False
+    # Cache-Control sent with catalog reads, for browsers and CDNs
+    CATALOG_MAX_AGE_SECONDS: int = 60
+    CATALOG_STALE_WHILE_REVALIDATE_SECONDS: int = 300
+
+    # Authenticated users are cached per worker; user changes evict them at
+    # once, the TTL only bounds memory churn
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    # Verified tokens skip the signature check for this long, and never
+    # past their own expiry
+    TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # bcrypt runs in this many worker processes (0: inline); requests
+    # beyond PASSWORD_HASH_MAX_PENDING queued hashes get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # Token-bucket limits ("<count>/<period>", empty to disable); "memory"
+    # buckets are per worker, "database" ones are shared through Postgres
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_LOGIN: str = "10/minute"
+    RATE_LIMIT_SIGNUP: str = "5/minute"
+    RATE_LIMIT_ORDERS: str = "30/minute"
+
+    # Responses to POSTs sent with an Idempotency-Key are replayed to
+    # retries for IDEMPOTENCY_TTL_SECONDS. A retry waits up to
+    # IDEMPOTENCY_WAIT_SECONDS for a first attempt still in flight; one
+    # running past IDEMPOTENCY_LOCK_SECONDS is presumed lost
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0
+    # Expired keys are deleted this often (0 disables it), this many per
+    # transaction
+    IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS: float = 600.0
+    IDEMPOTENCY_CLEANUP_BATCH_SIZE: int = 10000
 
     FIRST_SUPERUSER: str = "admin@example.com"
     FIRST_SUPERUSER_PASSWORD: str = "admin"
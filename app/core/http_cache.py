@@ -0,0 +1,60 @@
+from hashlib import blake2b
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+class Representation:
+    """
+    A response body serialized once, with its strong ETag.
+
+    The ETag hashes the body itself, so every worker derives the same tag
+    for the same content and it changes whenever the content does.
+    """
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "Representation":
+        return cls(model.model_dump_json().encode())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header (weak comparison, as RFC 9110 requires).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_control(max_age: int, stale_while_revalidate: int) -> str:
+    directives = ["public", f"max-age={max_age}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    return ", ".join(directives)
+
+
+def conditional_response(
+        request: Request, representation: Representation, cache_control: str
+) -> Response:
+    """
+    Answer a GET with 304 Not Modified if the client holds the current
+    representation, with the full body otherwise.
+    """
+    headers = {"ETag": representation.etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), representation.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=representation.body, media_type="application/json", headers=headers
+    )
@@ -1,5 +1,9 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, UTC
-from typing import Any, Union, Optional
+from typing import Any, Callable, Union, Optional, TypeVar
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -29,3 +33,71 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+T = TypeVar("T")
+
+
+class HashingQueueFull(Exception):
+    """
+    Too many password hashes are already queued; retry later.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so hashing never occupies the
+    event loop or the request threadpool.
+
+    At most `max_pending` operations may be running or queued; beyond that
+    HashingQueueFull is raised at once instead of letting callers pile up.
+    With `workers=0` hashing runs inline (for tests and benchmarks).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process that runs an event loop and threads is unsafe.
+            # Workers run at a lower priority, so hashing only uses CPU time
+            # that request handling leaves idle.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=os.nice,
+                initargs=(10,),
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.max_pending:
+            raise HashingQueueFull()
+        self.pending += 1
+        try:
+            if not self.workers:
+                return func(*args)
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
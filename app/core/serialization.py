@@ -0,0 +1,41 @@
+from typing import Any, Generic, Optional, Type, TypeVar
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+
+class JSONBytesResponse(Response):
+    """
+    A JSON response whose body is already serialized.
+    """
+
+    media_type = "application/json"
+
+
+class ResponseAdapter(Generic[T]):
+    """
+    A prebuilt serializer from ORM objects straight to JSON bytes.
+
+    Attributes are read once by a single validation of the whole response
+    (`from_attributes`), and the result is dumped by pydantic-core without
+    building intermediate dicts. Endpoints returning `response()` bypass
+    FastAPI's own validate-then-serialize pass, so the response model is
+    still declared on the route for the OpenAPI schema only.
+    """
+
+    def __init__(self, schema: Type[T]):
+        self.adapter = TypeAdapter(schema)
+
+    def dump_json(self, content: Any) -> bytes:
+        return self.adapter.dump_json(
+            self.adapter.validate_python(content, from_attributes=True)
+        )
+
+    def response(
+            self, content: Any, *, status_code: int = 200, headers: Optional[dict] = None
+    ) -> JSONBytesResponse:
+        return JSONBytesResponse(
+            self.dump_json(content), status_code=status_code, headers=headers
+        )
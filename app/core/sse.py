@@ -0,0 +1,29 @@
+from typing import Any, Optional
+
+from fastapi.responses import StreamingResponse
+
+# A comment line: keeps proxies from timing out an idle stream and makes a
+# vanished client show up as a failed write
+KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_message(data: str, event: Optional[str] = None) -> bytes:
+    """
+    Encode one server-sent event.
+    """
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class EventStreamResponse(StreamingResponse):
+    media_type = "text/event-stream"
+
+    def __init__(self, content: Any, status_code: int = 200, **kwargs: Any):
+        headers = {
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no",
+            **(kwargs.pop("headers", None) or {}),
+        }
+        super().__init__(content, status_code=status_code, headers=headers, **kwargs)
@@ -1,6 +1,8 @@
-from typing import List, Optional, Dict, Any, Union, Type
+from typing import List, Optional, Dict, Any, Union, Type, Tuple
+from uuid import uuid4
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
 from app.models.address import Address
@@ -8,62 +10,71 @@ from app.schemas.address import AddressCreate, AddressUpdate
 
 
 class CRUDAddress(CRUDBase[Address, AddressCreate, AddressUpdate]):
-    def get_multi_by_user(
-            self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Type[Address]]:
+    async def get_multi_by_user(
+            self,
+            db: AsyncSession,
+            *,
+            user_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 100
+    ) -> Tuple[List[Address], Optional[str]]:
         """
         Get multiple addresses by user ID.
         """
-        return (
-            db.query(Address)
-            .filter(Address.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return await self.get_page(
+            db,
+            select(Address).where(Address.user_id == user_id),
+            cursor=cursor,
+            limit=limit,
         )
 
-    def create_with_user(
-            self, db: Session, *, obj_in: AddressCreate, user_id: str
+    async def create_with_user(
+            self, db: AsyncSession, *, obj_in: AddressCreate, user_id: str
     ) -> Address:
         """
         Create a new address for a specific user.
         """
         obj_in_data = obj_in.dict()
-        db_obj = Address(**obj_in_data, user_id=user_id)
+        db_obj = Address(**obj_in_data, id=str(uuid4()), user_id=user_id)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def get_default_address(self, db: Session, *, user_id: int) -> Optional[Address]:
+    async def get_default_address(
+            self, db: AsyncSession, *, user_id: int
+    ) -> Optional[Address]:
         """
         Get the default address for a user.
         """
-        return (
-            db.query(Address)
-            .filter(Address.user_id == user_id, Address.is_default == True)
-            .first()
+        result = await db.execute(
+            select(Address)
+            .where(Address.user_id == user_id, Address.is_default == True)
         )
+        return result.scalars().first()
 
-    def set_as_default(self, db: Session, *, address_id: int, user_id: int) -> Address:
+    async def set_as_default(
+            self, db: AsyncSession, *, address_id: int, user_id: int
+    ) -> Address:
         """
         Set an address as default for a user, and clear default status from others.
         """
-        # Clear default status from all user's addresses
-        user_addresses = self.get_multi_by_user(db, user_id=user_id)
-        for address in user_addresses:
-            address.is_default = False
-            db.add(address)
-
-        # Set the specified address as default
-        address = self.get(db, id=address_id)
+        address = await self.get(db, id=address_id)
         if not address or address.user_id != user_id:
             raise ValueError("Address not found or doesn't belong to the user")
 
+        # Clear default status from all user's addresses
+        await db.execute(
+            update(Address)
+            .where(Address.user_id == user_id, Address.id != address_id)
+            .values(is_default=False)
+        )
+
+        # Set the specified address as default
         address.is_default = True
         db.add(address)
-        db.commit()
-        db.refresh(address)
+        await db.commit()
+        await db.refresh(address)
         return address
 
 
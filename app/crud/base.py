@@ -1,17 +1,30 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, inspect, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.sql.base import ExecutableOption
 
+from app.crud.loader import DataLoader
+from app.crud.pagination import decode_cursor, encode_cursor
 from app.db.base import Base
+from app.db.changes import record_change
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+_LOADERS_KEY = "loaders"
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Columns that define the keyset order of list queries. The last one must
+    # be unique so every row has a distinct position; back them with an index.
+    pagination_keys: Sequence[str] = ("id",)
+    pagination_descending: bool = False
+
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -23,34 +36,159 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
+    async def get(
+            self, db: AsyncSession, id: Any, *, options: Sequence[ExecutableOption] = ()
+    ) -> Optional[ModelType]:
         """
         Get a record by ID.
+
+        `options` are loader options (selectinload, joinedload, ...) naming
+        the relationships to load together with the record.
         """
-        return db.query(self.model).filter(self.model.id == id).first()
+        result = await db.execute(
+            select(self.model).where(self.model.id == id).options(*options)
+        )
+        return result.unique().scalars().first()
 
-    def get_multi(
-            self, db: Session, *, skip: int = 0, limit: int = 100
+    async def get_many(
+            self,
+            db: AsyncSession,
+            *,
+            ids: Sequence[Any],
+            options: Sequence[ExecutableOption] = ()
     ) -> List[ModelType]:
         """
-        Get multiple records with pagination.
+        Get the records matching any of `ids` with a single IN query.
         """
-        return db.query(self.model).offset(skip).limit(limit).all()
+        if not ids:
+            return []
+        result = await db.execute(
+            select(self.model).where(self.model.id.in_(ids)).options(*options)
+        )
+        return list(result.unique().scalars().all())
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
+    def fields_options(
+            self, fields: Sequence[str], *, include: Sequence[str] = ()
+    ) -> List[ExecutableOption]:
+        """
+        Loader options fetching only what `fields` (a sparse fieldset) are
+        backed by: their columns, plus the key and pagination columns and
+        `include`, and their relationships. Fields the model doesn't have
+        are left to the schema's defaults.
+        """
+        mapper = inspect(self.model)
+        names = {"id", *self.pagination_keys, *include, *fields}
+        options: List[ExecutableOption] = [load_only(*[
+            getattr(self.model, name) for name in mapper.column_attrs.keys()
+            if name in names
+        ])]
+        options += [
+            selectinload(getattr(self.model, name))
+            for name in mapper.relationships.keys() if name in fields
+        ]
+        return options
+
+    def loader(
+            self, db: AsyncSession, *, options: Sequence[ExecutableOption] = ()
+    ) -> DataLoader:
+        """
+        This model's DataLoader for `db`, and so for the request holding it:
+        `load` calls made together, from anywhere, share one IN query.
+        """
+        loaders = db.info.setdefault(_LOADERS_KEY, {})
+        key = (self.model, tuple(options))
+        if key not in loaders:
+            loaders[key] = DataLoader(self, db, options)
+        return loaders[key]
+
+    async def load_many(
+            self,
+            db: AsyncSession,
+            *,
+            ids: Sequence[Any],
+            options: Sequence[ExecutableOption] = ()
+    ) -> List[ModelType]:
+        """
+        Get the records matching `ids` through the request's DataLoader, in
+        the order asked for. Duplicate and unknown IDs are left out.
+        """
+        records = await self.loader(db, options=options).load_many(
+            list(dict.fromkeys(str(id) for id in ids))
+        )
+        return [record for record in records if record is not None]
+
+    async def get_multi(
+            self,
+            db: AsyncSession,
+            *,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            options: Sequence[ExecutableOption] = ()
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Get a page of records and the cursor of the following page.
+        """
+        return await self.get_page(
+            db, select(self.model).options(*options), cursor=cursor, limit=limit
+        )
+
+    async def get_page(
+            self,
+            db: AsyncSession,
+            stmt: Select,
+            *,
+            cursor: Optional[str] = None,
+            limit: int = 100
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Run `stmt` as a keyset-paginated query.
+
+        Rows are ordered by `pagination_keys` and the page starts right after
+        the row encoded in `cursor`, so fetching any page costs the same as
+        fetching the first one. The returned cursor is None on the last page.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        columns = [getattr(self.model, key) for key in self.pagination_keys]
+        if cursor:
+            values = decode_cursor(cursor, columns)
+            position = tuple_(*[
+                literal(value, column.type) for column, value in zip(columns, values)
+            ])
+            if self.pagination_descending:
+                stmt = stmt.where(tuple_(*columns) < position)
+            else:
+                stmt = stmt.where(tuple_(*columns) > position)
+        if self.pagination_descending:
+            stmt = stmt.order_by(*[column.desc() for column in columns])
+        else:
+            stmt = stmt.order_by(*columns)
+
+        result = await db.execute(stmt.limit(limit + 1))
+        items = list(result.unique().scalars().all())
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(
+                [getattr(items[-1], key) for key in self.pagination_keys]
+            )
+        return items, next_cursor
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         """
         Create a new record.
         """
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        record_change(db, self.model.__tablename__, db_obj.id)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def update(
+    async def update(
             self,
-            db: Session,
+            db: AsyncSession,
             *,
             db_obj: ModelType,
             obj_in: Union[UpdateSchemaType, Dict[str, Any]]
@@ -58,7 +196,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         Update a record.
         """
-        obj_data = jsonable_encoder(db_obj)
+        obj_data = inspect(self.model).column_attrs.keys()
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
@@ -67,15 +205,23 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        record_change(db, self.model.__tablename__, db_obj.id)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def remove(self, db: Session, *, id: int) -> ModelType:
+    async def remove(self, db: AsyncSession, *, id: Any) -> ModelType:
         """
         Delete a record.
         """
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
-        db.commit()
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        record_change(db, self.model.__tablename__, id)
+        await db.commit()
         return obj
+
+    def is_admin(self, user: Any) -> bool:
+        """
+        Check if a user has superuser privileges.
+        """
+        return bool(user.is_superuser)
@@ -0,0 +1,84 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
+
+if TYPE_CHECKING:
+    from app.crud.base import CRUDBase
+
+
+class DataLoader:
+    """
+    Batches record lookups by ID for one model and session.
+
+    Every ID passed to `load` before the event loop next gets to run is
+    fetched by a single IN query, so lookups issued together (with
+    asyncio.gather, say) cost one round trip. Each ID is fetched at most
+    once: later loads of it, in the same request, get the same record.
+    """
+
+    def __init__(
+            self,
+            crud: "CRUDBase",
+            db: AsyncSession,
+            options: Sequence[ExecutableOption] = ()
+    ):
+        self.crud = crud
+        self.db = db
+        self.options = options
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._tasks: Set[asyncio.Task] = set()
+        # A session runs one query at a time
+        self._lock = asyncio.Lock()
+
+    async def load(self, id: Any) -> Optional[Any]:
+        """
+        The record with `id`, or None if there is none.
+        """
+        key = str(id)
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+        # One waiter being cancelled mustn't cancel the others
+        return await asyncio.shield(future)
+
+    async def load_many(self, ids: Sequence[Any]) -> List[Optional[Any]]:
+        """
+        The records with `ids`, in the same order (None for unknown IDs),
+        fetched together.
+        """
+        return list(await asyncio.gather(*(self.load(id) for id in ids)))
+
+    def _dispatch(self) -> None:
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._fetch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: List[str]) -> None:
+        try:
+            async with self._lock:
+                records = await self.crud.get_many(
+                    self.db, ids=batch, options=self.options
+                )
+        except BaseException as e:
+            for key in batch:
+                # Forget failed IDs, so a later load tries again
+                future = self._futures.pop(key)
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                    future.exception()
+                else:
+                    future.cancel()
+            if not isinstance(e, Exception):
+                raise
+            return
+        by_id = {str(record.id): record for record in records}
+        for key in batch:
+            self._futures[key].set_result(by_id.get(key))
@@ -1,81 +1,367 @@
-from typing import List, Optional, Dict, Any, Union, Type
+from datetime import date, datetime, time, timedelta, timezone
+from typing import (
+    List, Optional, Dict, Any, Union, Type, Tuple, Sequence, AsyncIterator
+)
 
-from sqlalchemy.orm import Session
+from uuid import uuid4
+
+from sqlalchemy import (
+    Date, Row, SmallInteger, cast, delete, func, insert, literal, select, text
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.base import ExecutableOption
 
 from app.crud.base import CRUDBase
-from app.models.order import Order, OrderItem
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.models.sales_rollup import ProductSalesDaily, SalesDaily
 from app.schemas.order import OrderCreate, OrderUpdate
 
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
-    def get_multi_by_user(
-            self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Type[Order]]:
+    pagination_keys = ("created_at", "id")
+    pagination_descending = True
+
+    # Loader options for order responses: the items of every order on a page
+    # come from one extra SELECT ... WHERE order_id IN (...)
+    items_options = (selectinload(Order.items),)
+    # Loader options for the full order view: address joined into the order
+    # query, items and their products in one more query
+    detail_options = (
+        joinedload(Order.address),
+        selectinload(Order.items).joinedload(OrderItem.product),
+    )
+
+    async def get_multi_by_user(
+            self,
+            db: AsyncSession,
+            *,
+            user_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            options: Sequence[ExecutableOption] = ()
+    ) -> Tuple[List[Order], Optional[str]]:
         """
-        Get multiple orders by user ID.
+        Get multiple orders by user ID, newest first.
         """
-        return (
-            db.query(Order)
-            .filter(Order.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return await self.get_page(
+            db,
+            select(Order).where(Order.user_id == user_id).options(*options),
+            cursor=cursor,
+            limit=limit,
         )
 
-    def create_with_items(
-            self, db: Session, *, obj_in: OrderCreate, user_id: str, items: List[Dict[str, Any]]
+    async def create_with_items(
+            self,
+            db: AsyncSession,
+            *,
+            obj_in: Dict[str, Any],
+            user_id: str,
+            items: List[Dict[str, Any]]
     ) -> Order:
         """
         Create a new order with order items.
+
+        The order row and all of its items are written with two INSERT
+        statements, whatever the number of items. Does not commit, so the
+        caller can make further changes in the same transaction.
         """
-        order_data = obj_in.dict(exclude={"items"})
-        db_obj = Order(**order_data, user_id=user_id)
+        db_obj = Order(**obj_in, user_id=user_id)
         db.add(db_obj)
-        db.flush()  # Get the order ID without committing
+        await db.flush()  # Get the order ID without committing
 
         # Create order items
-        for item_data in items:
-            order_item = OrderItem(
-                order_id=db_obj.id,
-                product_id=item_data["product_id"],
-                quantity=item_data["quantity"],
-                unit_price=item_data["price"],
+        await db.execute(
+            insert(OrderItem).values([
+                {
+                    "id": str(uuid4()),
+                    "order_id": db_obj.id,
+                    "product_id": item_data["product_id"],
+                    "quantity": item_data["quantity"],
+                    "unit_price": item_data["price"],
+                }
+                for item_data in items
+            ])
+        )
+        return db_obj
+
+    async def get_item_quantities(
+            self, db: AsyncSession, *, order_id: str
+    ) -> Dict[str, int]:
+        """
+        Get the ordered quantity of each product in an order.
+        """
+        result = await db.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id == order_id)
+            .group_by(OrderItem.product_id)
+        )
+        return {product_id: quantity for product_id, quantity in result.all()}
+
+    async def get_orders_by_status(
+            self,
+            db: AsyncSession,
+            *,
+            status: str,
+            cursor: Optional[str] = None,
+            limit: int = 100
+    ) -> Tuple[List[Order], Optional[str]]:
+        """
+        Get orders by status, newest first.
+        """
+        return await self.get_page(
+            db, select(Order).where(Order.status == status), cursor=cursor, limit=limit
+        )
+
+    async def get_recent_orders(
+            self,
+            db: AsyncSession,
+            *,
+            days: int = 7,
+            cursor: Optional[str] = None,
+            limit: int = 100
+    ) -> Tuple[List[Order], Optional[str]]:
+        """
+        Get orders created in the last X days, newest first.
+        """
+        date_from = datetime.now() - timedelta(days=days)
+        return await self.get_page(
+            db, select(Order).where(Order.created_at >= date_from), cursor=cursor, limit=limit
+        )
+
+    async def get_statuses(
+            self,
+            db: AsyncSession,
+            *,
+            order_id: Optional[str] = None,
+            user_id: Optional[str] = None,
+            active_only: bool = False
+    ) -> List[Row]:
+        """
+        Current status of an order, or of a user's orders (only those not yet
+        delivered or cancelled with `active_only`).
+        """
+        stmt = select(
+            Order.id, Order.user_id, Order.status, Order.created_at, Order.updated_at
+        )
+        if order_id is not None:
+            stmt = stmt.where(Order.id == order_id)
+        if user_id is not None:
+            stmt = stmt.where(Order.user_id == user_id)
+        if active_only:
+            stmt = stmt.where(
+                Order.status.not_in([OrderStatus.DELIVERED, OrderStatus.CANCELLED])
             )
-            db.add(order_item)
+        return list((await db.execute(stmt.order_by(Order.created_at, Order.id))).all())
 
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+    async def stream_export(
+            self,
+            db: AsyncSession,
+            *,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None,
+            statuses: Sequence[OrderStatus] = (),
+            batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream orders created in [created_from, created_to), oldest first, in
+        batches of plain rows: one per order item (item columns are None for
+        an order without items), with each order's rows adjacent.
 
-    def get_orders_by_status(
-            self, db: Session, *, status: str, skip: int = 0, limit: int = 100
-    ) -> List[Type[Order]]:
+        Rows come from a server-side cursor and never enter the session, so
+        memory stays flat however many orders match.
         """
-        Get orders by status.
+        stmt = (
+            select(
+                Order.id,
+                Order.user_id,
+                Order.address_id,
+                Order.status,
+                Order.total_amount,
+                Order.is_paid,
+                Order.payment_method,
+                Order.delivery_time,
+                Order.created_at,
+                Order.updated_at,
+                OrderItem.id.label("item_id"),
+                OrderItem.product_id,
+                OrderItem.quantity,
+                OrderItem.unit_price,
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .order_by(Order.created_at, Order.id, OrderItem.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if created_from is not None:
+            stmt = stmt.where(Order.created_at >= _as_naive_utc(created_from))
+        if created_to is not None:
+            stmt = stmt.where(Order.created_at < _as_naive_utc(created_to))
+        if statuses:
+            stmt = stmt.where(Order.status.in_(statuses))
+
+        result = await db.stream(stmt)
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
+
+    async def get_daily_sales(
+            self,
+            db: AsyncSession,
+            *,
+            date_from: date,
+            date_to: date,
+            statuses: Sequence[OrderStatus] = ()
+    ) -> List[Row]:
         """
-        return (
-            db.query(Order)
-            .filter(Order.status == status)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        Orders, revenue and items per day from date_from to date_to
+        (inclusive), read from the daily rollup. Days without orders are
+        omitted.
+        """
+        stmt = (
+            select(
+                SalesDaily.day,
+                func.sum(SalesDaily.order_count).label("order_count"),
+                func.sum(SalesDaily.revenue).label("revenue"),
+                func.sum(SalesDaily.item_count).label("item_count"),
+            )
+            .where(SalesDaily.day.between(date_from, date_to))
+            .group_by(SalesDaily.day)
+            .having(func.sum(SalesDaily.order_count) != 0)
+            .order_by(SalesDaily.day)
         )
+        if statuses:
+            stmt = stmt.where(SalesDaily.status.in_(statuses))
+        return list((await db.execute(stmt)).all())
 
-    def get_recent_orders(
-            self, db: Session, *, days: int = 7, skip: int = 0, limit: int = 100
-    ) -> List[Type[Order]]:
+    async def get_status_sales(
+            self, db: AsyncSession, *, date_from: date, date_to: date
+    ) -> List[Row]:
         """
-        Get orders created in the last X days.
+        Orders, revenue and items per status over a range of days.
         """
-        import datetime
-        date_from = datetime.datetime.now() - datetime.timedelta(days=days)
-        return (
-            db.query(Order)
-            .filter(Order.created_at >= date_from)
-            .offset(skip)
+        result = await db.execute(
+            select(
+                SalesDaily.status,
+                func.sum(SalesDaily.order_count).label("order_count"),
+                func.sum(SalesDaily.revenue).label("revenue"),
+                func.sum(SalesDaily.item_count).label("item_count"),
+            )
+            .where(SalesDaily.day.between(date_from, date_to))
+            .group_by(SalesDaily.status)
+            .having(func.sum(SalesDaily.order_count) != 0)
+            .order_by(SalesDaily.status)
+        )
+        return list(result.all())
+
+    async def get_product_sales(
+            self,
+            db: AsyncSession,
+            *,
+            date_from: date,
+            date_to: date,
+            statuses: Sequence[OrderStatus] = (),
+            limit: int = 20
+    ) -> List[Row]:
+        """
+        The best-selling products by revenue over a range of days, read from
+        the product rollup.
+        """
+        totals = (
+            select(
+                ProductSalesDaily.product_id,
+                func.sum(ProductSalesDaily.quantity).label("quantity"),
+                func.sum(ProductSalesDaily.revenue).label("revenue"),
+                func.sum(ProductSalesDaily.line_count).label("line_count"),
+            )
+            .where(ProductSalesDaily.day.between(date_from, date_to))
+            .group_by(ProductSalesDaily.product_id)
+            .having(func.sum(ProductSalesDaily.line_count) != 0)
+            .order_by(
+                func.sum(ProductSalesDaily.revenue).desc(), ProductSalesDaily.product_id
+            )
             .limit(limit)
-            .all()
         )
+        if statuses:
+            totals = totals.where(ProductSalesDaily.status.in_(statuses))
+        totals = totals.subquery()
+        result = await db.execute(
+            select(totals, Product.name)
+            .outerjoin(Product, Product.id == totals.c.product_id)
+            .order_by(totals.c.revenue.desc(), totals.c.product_id)
+        )
+        return list(result.all())
+
+    async def rebuild_sales_rollups(
+            self, db: AsyncSession, *, since: Optional[date] = None
+    ) -> None:
+        """
+        Recompute the sales rollups from the order tables for every day from
+        `since` on (all days by default), to backfill them or to repair any
+        drift. Order writes wait meanwhile. Does not commit.
+        """
+        await db.execute(text(
+            f'LOCK TABLE "{Order.__tablename__}", {OrderItem.__tablename__} IN SHARE MODE'
+        ))
+        day = cast(Order.created_at, Date)
+        # On the column itself, so the created_at index applies
+        in_window = [Order.created_at >= datetime.combine(since, time())] if since else []
+        await db.execute(
+            delete(SalesDaily).where(*([SalesDaily.day >= since] if since else []))
+        )
+        await db.execute(
+            delete(ProductSalesDaily)
+            .where(*([ProductSalesDaily.day >= since] if since else []))
+        )
+
+        items = (
+            select(OrderItem.order_id, func.sum(OrderItem.quantity).label("quantity"))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(*in_window)
+            .group_by(OrderItem.order_id)
+            .subquery()
+        )
+        await db.execute(
+            insert(SalesDaily).from_select(
+                ["day", "status", "shard", "order_count", "revenue", "item_count"],
+                select(
+                    day,
+                    Order.status,
+                    literal(0, SmallInteger),
+                    func.count(),
+                    func.sum(Order.total_amount),
+                    func.coalesce(func.sum(items.c.quantity), 0),
+                )
+                .outerjoin(items, items.c.order_id == Order.id)
+                .where(*in_window)
+                .group_by(day, Order.status),
+            )
+        )
+        await db.execute(
+            insert(ProductSalesDaily).from_select(
+                ["day", "product_id", "status", "quantity", "revenue", "line_count"],
+                select(
+                    day,
+                    OrderItem.product_id,
+                    Order.status,
+                    func.sum(OrderItem.quantity),
+                    func.sum(OrderItem.quantity * OrderItem.unit_price),
+                    func.count(),
+                )
+                .join(OrderItem, OrderItem.order_id == Order.id)
+                .where(*in_window)
+                .group_by(day, OrderItem.product_id, Order.status),
+            )
+        )
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    # created_at is a naive UTC timestamp
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 crud_order = CRUDOrder(Order)
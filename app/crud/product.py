@@ -1,85 +1,318 @@
-from typing import List, Optional, Dict, Any, Union, Type
+from typing import List, Optional, Dict, Any, Sequence, Union, Type, Tuple
 
-from sqlalchemy.orm import Session
+from uuid import uuid4
+
+from sqlalchemy import (
+    Float, Integer, String, and_, column, delete, func, literal_column, or_, select, table, text,
+    update, values
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 
 from app.crud.base import CRUDBase
-from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate
+from app.crud.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.db.changes import record_change
+from app.models.category_facet import CategoryFacet
+from app.models.product import SEARCH_CONFIG, Product
+from app.schemas.product import ProductCreate, ProductImportKey, ProductUpdate
+
+_IMPORT_STAGE = "product_import_stage"
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product_ids: List[str]):
+        super().__init__(f"Insufficient stock for products: {', '.join(product_ids)}")
+        self.product_ids = product_ids
 
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
-    def get_by_name(self, db: Session, *, name: str) -> Optional[Product]:
+    pagination_keys = ("created_at", "id")
+
+    async def get_by_name(self, db: AsyncSession, *, name: str) -> Optional[Product]:
         """
         Get a product by name.
         """
-        return db.query(Product).filter(Product.name == name).first()
+        result = await db.execute(select(Product).where(Product.name == name))
+        return result.scalars().first()
 
-    def get_by_category(
-            self, db: Session, *, category: str, skip: int = 0, limit: int = 100
-    ) -> List[Type[Product]]:
+    async def get_by_category(
+            self,
+            db: AsyncSession,
+            *,
+            category: str,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            options: Sequence[ExecutableOption] = ()
+    ) -> Tuple[List[Product], Optional[str]]:
         """
         Get products by category.
         """
-        return (
-            db.query(Product)
-            .filter(Product.category == category)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return await self.get_page(
+            db,
+            select(Product).where(Product.category == category).options(*options),
+            cursor=cursor,
+            limit=limit,
         )
 
-    def get_available_products(
-            self, db: Session, *, skip: int = 0, limit: int = 100
-    ) -> List[Type[Product]]:
+    async def get_available_products(
+            self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Product], Optional[str]]:
         """
         Get products that are in stock.
         """
-        return (
-            db.query(Product)
-            .filter(Product.stock_quantity > 0)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return await self.get_page(
+            db, select(Product).where(Product.stock_quantity > 0), cursor=cursor, limit=limit
         )
 
-    def update_stock(
-            self, db: Session, *, product_id: int, quantity_change: int
+    async def update_stock(
+            self, db: AsyncSession, *, product_id: int, quantity_change: int
     ) -> Product:
         """
         Update product stock quantity.
+
+        The change is applied by the database in a single UPDATE, so
+        concurrent changes are never lost. Stock doesn't go below 0.
         """
-        product = self.get(db, id=product_id)
+        result = await db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(
+                stock_quantity=func.greatest(Product.stock_quantity + quantity_change, 0)
+            )
+            .returning(Product)
+        )
+        product = result.scalars().first()
         if not product:
             raise ValueError(f"Product with ID {product_id} not found")
+        record_change(db, Product.__tablename__, product.id)
+        await db.commit()
+        return product
 
-        product.stock_quantity += quantity_change
+    async def reserve_stock(
+            self, db: AsyncSession, *, quantities: Dict[str, int]
+    ) -> None:
+        """
+        Atomically take `quantities` (product ID -> amount) out of stock.
 
-        # Ensure stock quantity doesn't go below 0
-        if product.stock_quantity < 0:
-            product.stock_quantity = 0
+        One conditional UPDATE decrements every product that still has enough
+        stock. The rows are locked in ID order first, so concurrent orders
+        touching the same products queue up instead of deadlocking, and
+        orders for other products are not blocked at all. If any product is
+        short, InsufficientStockError is raised and the caller must roll
+        back. Does not commit.
+        """
+        product_ids = sorted(quantities)
+        requested = values(
+            column("id", String), column("quantity", Integer), name="requested"
+        ).data([(product_id, quantities[product_id]) for product_id in product_ids])
+        locked = (
+            select(Product.id)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update(key_share=True)
+            .cte("locked")
+        )
+        result = await db.execute(
+            update(Product)
+            .where(
+                Product.id == requested.c.id,
+                Product.id.in_(select(locked.c.id)),
+                Product.stock_quantity >= requested.c.quantity,
+            )
+            .values(stock_quantity=Product.stock_quantity - requested.c.quantity)
+            .returning(Product.id, Product.stock_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        reserved = set()
+        for product_id, stock_quantity in result.all():
+            reserved.add(product_id)
+            # Only running out shows in the catalog (in-stock counts, suggestions)
+            if stock_quantity <= 0:
+                record_change(db, Product.__tablename__, product_id)
+        short = [product_id for product_id in product_ids if product_id not in reserved]
+        if short:
+            raise InsufficientStockError(short)
 
-        db.add(product)
-        db.commit()
-        db.refresh(product)
-        return product
+    async def release_stock(
+            self, db: AsyncSession, *, quantities: Dict[str, int]
+    ) -> None:
+        """
+        Return `quantities` (product ID -> amount) to stock, locking the
+        rows in ID order like `reserve_stock`. Does not commit.
+        """
+        product_ids = sorted(quantities)
+        released = values(
+            column("id", String), column("quantity", Integer), name="released"
+        ).data([(product_id, quantities[product_id]) for product_id in product_ids])
+        locked = (
+            select(Product.id)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update(key_share=True)
+            .cte("locked")
+        )
+        result = await db.execute(
+            update(Product)
+            .where(Product.id == released.c.id, Product.id.in_(select(locked.c.id)))
+            .values(stock_quantity=Product.stock_quantity + released.c.quantity)
+            .returning(Product.id, Product.stock_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        for product_id, stock_quantity in result.all():
+            # Only coming back into stock shows in the catalog
+            if 0 < stock_quantity <= quantities[product_id]:
+                record_change(db, Product.__tablename__, product_id)
 
-    def search_products(
-            self, db: Session, *, query: str, skip: int = 0, limit: int = 100
-    ) -> List[Type[Product]]:
+    async def search_products(
+            self,
+            db: AsyncSession,
+            *,
+            query: str,
+            category: Optional[str] = None,
+            is_available: Optional[bool] = None,
+            cursor: Optional[str] = None,
+            limit: int = 100
+    ) -> Tuple[List[Product], Optional[str]]:
         """
-        Search products by name or description.
+        Search products by name or description, most relevant first, and
+        return the cursor of the following page.
+
+        Matches the full-text index (websearch syntax: quoted phrases, `or`,
+        `-word`) or, to tolerate typos, names trigram-similar to the query.
+        Both conditions are served by GIN indexes. Pages are keyed by
+        (relevance, id), which is fixed for a given query.
         """
-        search_pattern = f"%{query}%"
-        return (
-            db.query(Product)
-            .filter(
-                (Product.name.ilike(search_pattern)) |
-                (Product.description.ilike(search_pattern))
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        tsquery = func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), query
+        )
+        relevance = (
+            func.ts_rank_cd(Product.search_vector, tsquery, type_=Float)
+            + func.similarity(Product.name, query, type_=Float)
+        )
+        stmt = select(Product, relevance).where(or_(
+            Product.search_vector.op("@@")(tsquery),
+            Product.name.op("%")(query),
+        ))
+        if category is not None:
+            stmt = stmt.where(Product.category == category)
+        if is_available is not None:
+            stmt = stmt.where(Product.is_available == is_available)
+        if cursor:
+            rank, id = decode_cursor(cursor, [relevance, Product.id])
+            if not isinstance(rank, (int, float)) or not isinstance(id, str):
+                raise InvalidCursorError("Invalid cursor")
+            # Relevance descends, ties go by ascending ID
+            stmt = stmt.where(or_(
+                relevance < rank, and_(relevance == rank, Product.id > id)
+            ))
+        result = await db.execute(
+            stmt.order_by(relevance.desc(), Product.id).limit(limit + 1)
+        )
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][1], rows[-1][0].id])
+        return [product for product, _ in rows], next_cursor
+
+    async def get_category_facets(self, db: AsyncSession) -> List[CategoryFacet]:
+        """
+        Get product counts per category, from the trigger-maintained aggregate.
+        """
+        result = await db.execute(
+            select(CategoryFacet)
+            .where(CategoryFacet.product_count > 0)
+            .order_by(CategoryFacet.category)
+        )
+        return list(result.scalars().all())
+
+    async def rebuild_category_facets(self, db: AsyncSession) -> None:
+        """
+        Recompute the category facets from the product table, e.g. to backfill
+        a database created before them. Product writes wait meanwhile.
+        """
+        await db.execute(text(f"LOCK TABLE {Product.__tablename__} IN SHARE MODE"))
+        await db.execute(delete(CategoryFacet))
+        available = Product.is_available.is_(True)
+        await db.execute(
+            insert(CategoryFacet).from_select(
+                ["category", "product_count", "available_count", "in_stock_count"],
+                select(
+                    Product.category,
+                    func.count(),
+                    func.count().filter(available),
+                    func.count().filter(and_(available, Product.stock_quantity > 0)),
+                )
+                .where(Product.category.is_not(None))
+                .group_by(Product.category),
             )
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
+        record_change(db, Product.__tablename__)
+        await db.commit()
+
+    async def upsert_many(
+            self, db: AsyncSession, *, rows: List[Dict[str, Any]], key: ProductImportKey
+    ) -> Tuple[int, int]:
+        """
+        Insert or update a batch of products matched on `key` (sku or name).
+
+        Existing ids are resolved with one lookup, the batch is COPYed into a
+        temporary staging table and merged with a single
+        INSERT ... SELECT ... ON CONFLICT. Rows repeating a key within the
+        batch collapse to the last one. Returns the number of created and
+        updated products. Does not commit.
+        """
+        key_column = getattr(Product, key.value)
+        by_key = {row[key.value]: row for row in rows}
+        result = await db.execute(
+            select(key_column, Product.id).where(key_column.in_(list(by_key)))
+        )
+        existing = dict(result.all())
+
+        columns = ["id", *(c for c in rows[0] if c != "id")]
+        records = []
+        for key_value, row in by_key.items():
+            row = {**row, "id": existing.get(key_value) or str(uuid4())}
+            if row["stock_quantity"] is None and key_value not in existing:
+                row["stock_quantity"] = 0
+            records.append(tuple(row[c] for c in columns))
+
+        await db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {_IMPORT_STAGE} "
+            f"(LIKE {Product.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        ))
+        # Earlier batches of the same transaction may still be staged
+        await db.execute(text(f"TRUNCATE {_IMPORT_STAGE}"))
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            _IMPORT_STAGE, records=records, columns=columns
+        )
+
+        stage = table(_IMPORT_STAGE, *[column(c) for c in columns])
+        stmt = insert(Product.__table__).from_select(
+            columns, select(*[stage.c[c] for c in columns])
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={
+                **{
+                    c: stmt.excluded[c]
+                    for c in columns if c not in ("id", "stock_quantity")
+                },
+                "stock_quantity": func.coalesce(
+                    stmt.excluded.stock_quantity, Product.stock_quantity
+                ),
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        for record in records:
+            record_change(db, Product.__tablename__, record[0])
+        return len(records) - len(existing), len(existing)
 
 
 crud_product = CRUDProduct(Product)
@@ -1,60 +1,72 @@
 from typing import Any, Dict, Optional, Union, List, Type
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import password_hasher
 from app.crud.base import CRUDBase
+from app.db.changes import record_change
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
         """
         Get a user by email.
         """
-        return db.query(User).filter(User.email == email).first()
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         """
         Create a new user with hashed password.
+
+        Raises HashingQueueFull when the password hashing pool is saturated.
         """
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await password_hasher.hash(obj_in.password),
             full_name=obj_in.full_name,
             is_active=obj_in.is_active if hasattr(obj_in, "is_active") else True,
             phone=obj_in.phone if hasattr(obj_in, "phone") else None,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        record_change(db, User.__tablename__, db_obj.id)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def update(
-            self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
+    async def update(
+            self, db: AsyncSession, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> User:
         """
         Update a user.
+
+        Raises HashingQueueFull when the password hashing pool is saturated.
         """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
         if update_data.get("password"):
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await password_hasher.hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        return await super().update(db, db_obj=db_obj, obj_in=update_data)
 
-    def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
+    async def authenticate(
+            self, db: AsyncSession, *, email: str, password: str
+    ) -> Optional[User]:
         """
         Authenticate a user by email and password.
+
+        Raises HashingQueueFull when the password hashing pool is saturated.
         """
-        user = self.get_by_email(db, email=email)
+        user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             return None
         return user
 
@@ -64,11 +76,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """
         return user.is_active
 
-    def get_users_by_ids(self, db: Session, *, user_ids: List[int]) -> List[Type[User]]:
+    async def get_users_by_ids(
+            self, db: AsyncSession, *, user_ids: List[int]
+    ) -> List[User]:
         """
         Get multiple users by their IDs.
         """
-        return db.query(User).filter(User.id.in_(user_ids)).all()
+        result = await db.execute(select(User).where(User.id.in_(user_ids)))
+        return list(result.scalars().all())
 
 
 crud_user = CRUDUser(User)
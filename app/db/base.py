@@ -1,5 +1,10 @@
 from app.db.base_class import Base
 from app.models.user import User
 from app.models.product import Product
+from app.models.category_facet import CategoryFacet
 from app.models.order import Order, OrderItem
 from app.models.address import Address
+from app.models.sales_rollup import ProductSalesDaily, SalesDaily
+from app.models.rate_limit import RateLimitBucket
+from app.models.job import Job
+from app.models.idempotency import IdempotencyKey
@@ -0,0 +1,108 @@
+import json
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# Handlers receive the changed IDs, or None when any row may have changed
+ChangeHandler = Callable[[Optional[Set[str]]], None]
+
+_CHANGES_KEY = "changed_entities"
+_handlers: Dict[str, List[ChangeHandler]] = defaultdict(list)
+
+# Identifies this process in published events, so it skips its own
+ORIGIN = uuid4().hex
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+_MAX_PAYLOAD = 7900
+
+
+def record_change(db: AsyncSession, entity: str, id: Any = None) -> None:
+    """
+    Note that a row of `entity` (a table name) changed in the current
+    transaction. Pass no ID when the change may touch any row.
+
+    Handlers registered with `on_change` run once the transaction commits.
+    """
+    changes = db.info.setdefault(_CHANGES_KEY, {})
+    if id is None:
+        changes[entity] = None
+    elif entity not in changes:
+        changes[entity] = {str(id)}
+    elif changes[entity] is not None:
+        changes[entity].add(str(id))
+
+
+def on_change(entity: str, handler: ChangeHandler) -> None:
+    """
+    Call `handler` after every commit that changed rows of `entity`.
+    """
+    _handlers[entity].append(handler)
+
+
+def dispatch_changes(entity: str, ids: Optional[Set[str]]) -> None:
+    for handler in _handlers.get(entity, ()):
+        handler(ids)
+
+
+def dispatch_all_changed() -> None:
+    """
+    Run every handler as if any row changed, e.g. after missing events.
+    """
+    for entity in list(_handlers):
+        dispatch_changes(entity, None)
+
+
+def encode_change(entity: str, ids: Optional[Set[str]]) -> str:
+    payload = json.dumps({
+        "origin": ORIGIN,
+        "entity": entity,
+        "ids": sorted(ids) if ids is not None else None,
+    })
+    if len(payload) >= _MAX_PAYLOAD:
+        payload = json.dumps({"origin": ORIGIN, "entity": entity, "ids": None})
+    return payload
+
+
+def handle_remote_change(payload: str) -> None:
+    """
+    Dispatch a change published by another process.
+    """
+    change = json.loads(payload)
+    if change["origin"] == ORIGIN:
+        return
+    ids = change["ids"]
+    dispatch_changes(change["entity"], set(ids) if ids is not None else None)
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_changes(session: Session) -> None:
+    # NOTIFY is transactional: other processes only hear about the change
+    # once it commits, and never if it rolls back
+    if session.in_nested_transaction():
+        return
+    for entity, ids in session.info.get(_CHANGES_KEY, {}).items():
+        if entity in _handlers:
+            session.execute(select(func.pg_notify(
+                settings.DB_CHANGES_CHANNEL, encode_change(entity, ids)
+            )))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed_changes(session: Session) -> None:
+    # Releasing a savepoint fires after_commit too; wait for the real commit
+    if session.in_nested_transaction():
+        return
+    for entity, ids in session.info.pop(_CHANGES_KEY, {}).items():
+        dispatch_changes(entity, ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_CHANGES_KEY, None)
@@ -9,7 +9,7 @@ from app.db.session import AsyncSessionLocal
 async def create_first_superuser() -> None:
     async with AsyncSessionLocal() as session:
         user = await crud_user.get_by_email(
-            session=session, email=settings.FIRST_SUPERUSER
+            db=session, email=settings.FIRST_SUPERUSER
         )
         if not user:
             user_in = UserCreate(
@@ -19,5 +19,5 @@ async def create_first_superuser() -> None:
                 last_name="Admin",
                 phone="+1234567890"
             )
-            await crud_user.create(session=session, obj_in=user_in)
+            await crud_user.create(db=session, obj_in=user_in)
             print(f"Суперпользователь {settings.FIRST_SUPERUSER} создан")
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+import asyncpg
+
+from app.core.config import settings
+from app.db.changes import dispatch_all_changed, handle_remote_change
+
+logger = logging.getLogger(__name__)
+
+NotificationHandler = Callable[[str], None]
+
+
+class ChangeListener:
+    """
+    Background task that LISTENs for notifications from other workers, such
+    as committed entity changes, and passes them to the local handlers.
+
+    The connection is dedicated (a pooled one would be handed to requests
+    while subscribed) and is re-established when lost. Notifications sent
+    while disconnected are gone, so each channel's reconnect handler runs
+    every time the subscription is restored.
+    """
+
+    def __init__(
+            self,
+            dsn: str,
+            keepalive_interval: float = 30.0,
+            reconnect_delay: float = 1.0
+    ):
+        self.dsn = dsn
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_delay = reconnect_delay
+        self._channels: Dict[str, NotificationHandler] = {}
+        self._reconnect_handlers: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    def listen(
+            self,
+            channel: str,
+            handler: NotificationHandler,
+            on_reconnect: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Pass every payload NOTIFYed on `channel` to `handler`. Channels must
+        be registered before `start`.
+        """
+        self._channels[channel] = handler
+        if on_reconnect is not None:
+            self._reconnect_handlers.append(on_reconnect)
+
+    async def start(self, timeout: float = 5.0) -> None:
+        """
+        Start listening and wait (up to `timeout`) for the subscription, so
+        state built after this call doesn't miss changes.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Change listener not subscribed after %ss", timeout)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._subscribed.clear()
+
+    async def _run(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                for channel in self._channels:
+                    await connection.add_listener(channel, self._on_notification)
+                if self._subscribed.is_set():
+                    for on_reconnect in self._reconnect_handlers:
+                        on_reconnect()
+                self._subscribed.set()
+                while True:
+                    await asyncio.sleep(self.keepalive_interval)
+                    # Notices a dead connection, which would otherwise go quiet
+                    await connection.execute("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("Change listener disconnected: %s", e)
+            finally:
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notification(
+            self, connection: Any, pid: int, channel: str, payload: str
+    ) -> None:
+        try:
+            self._channels[channel](payload)
+        except Exception:
+            logger.exception("Failed to handle %s notification %r", channel, payload)
+
+
+change_listener = ChangeListener(str(settings.DATABASE_URL))
+change_listener.listen(
+    settings.DB_CHANGES_CHANNEL, handle_remote_change, on_reconnect=dispatch_all_changed
+)
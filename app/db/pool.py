@@ -0,0 +1,63 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """
+    Counters describing how connections are acquired from a pool.
+    """
+
+    def __init__(self) -> None:
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.acquisitions += 1
+        self.total_wait += seconds
+        if seconds > self.max_wait:
+            self.max_wait = seconds
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that measures how long callers wait for a connection.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return conn
+
+    def status_dict(self) -> Dict[str, Any]:
+        """
+        Current pool occupancy together with the acquisition counters.
+        """
+        stats = self.stats
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "acquisitions": stats.acquisitions,
+            "timeouts": stats.timeouts,
+            "wait_total_seconds": stats.total_wait,
+            "wait_max_seconds": stats.max_wait,
+            "wait_avg_seconds": (
+                stats.total_wait / stats.acquisitions if stats.acquisitions else 0.0
+            ),
+        }
@@ -0,0 +1,92 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+ROUTING_KEY = "routing_key"
+_WROTE_KEY = "wrote"
+
+
+class WriteTracker:
+    """
+    Remembers which clients committed a write recently.
+
+    Reads from those clients are sent to the primary until the window
+    passes, so they never observe a replica that is behind their own write.
+    The tracker is per process.
+    """
+
+    def __init__(self, window: float, max_keys: int = 100_000):
+        self.window = window
+        self.max_keys = max_keys
+        self._last_write: "OrderedDict[str, float]" = OrderedDict()
+
+    def mark(self, key: str) -> None:
+        self._last_write[key] = time.monotonic()
+        self._last_write.move_to_end(key)
+        while len(self._last_write) > self.max_keys:
+            self._last_write.popitem(last=False)
+
+    def recently_wrote(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        written_at = self._last_write.get(key)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > self.window:
+            del self._last_write[key]
+            return False
+        return True
+
+
+write_tracker = WriteTracker(settings.READ_YOUR_WRITES_SECONDS)
+
+
+def get_routing_key(request: Request) -> Optional[str]:
+    """
+    Identify the client behind a request: its bearer token, else its address.
+    """
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.blake2b(authorization.encode(), digest_size=16).hexdigest()
+    if request.client:
+        return request.client.host
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _remember_flush(session: Session, flush_context) -> None:
+    if ROUTING_KEY in session.info:
+        session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _remember_statement(orm_execute_state) -> None:
+    session = orm_execute_state.session
+    if ROUTING_KEY in session.info and (
+            orm_execute_state.is_insert
+            or orm_execute_state.is_update
+            or orm_execute_state.is_delete
+    ):
+        session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _track_commit(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    if session.info.pop(_WROTE_KEY, False):
+        write_tracker.mark(session.info[ROUTING_KEY])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_flush(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_WROTE_KEY, None)
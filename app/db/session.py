@@ -1,23 +1,79 @@
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool
+from app.db.routing import ROUTING_KEY, get_routing_key, write_tracker
 
-engine = create_async_engine(
-    str(settings.DATABASE_URL).replace("postgresql", "postgresql+asyncpg"),
-    echo=True
+
+def _create_engine(url: Any) -> AsyncEngine:
+    return create_async_engine(
+        str(url).replace("postgresql", "postgresql+asyncpg"),
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL)
+
+replica_engine: Optional[AsyncEngine] = (
+    _create_engine(settings.REPLICA_DATABASE_URL)
+    if settings.REPLICA_DATABASE_URL else None
 )
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+ReplicaSessionLocal = (
+    sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None else AsyncSessionLocal
+)
+
 
-async def get_db() -> AsyncGenerator[Any, Any]:
+async def get_db(request: Request) -> AsyncGenerator[Any, Any]:
     async with AsyncSessionLocal() as session:
+        session.info[ROUTING_KEY] = get_routing_key(request)
         try:
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[Any, Any]:
+    """
+    Session for read-only endpoints.
+
+    Served by the replica when one is configured, unless the client wrote
+    through the primary within READ_YOUR_WRITES_SECONDS.
+    """
+    session_factory = ReplicaSessionLocal
+    if write_tracker.recently_wrote(get_routing_key(request)):
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """
+    Occupancy and wait-time counters for the primary and replica pools.
+    """
+    return {
+        "primary": engine.pool.status_dict(),
+        "replica": replica_engine.pool.status_dict() if replica_engine else None,
+    }
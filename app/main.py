@@ -2,8 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.security import password_hasher
+from app.api.idempotency import IdempotencyMiddleware
 from app.api.v1.router import api_router
 from app.db.init_db import create_first_superuser
+from app.db.listener import change_listener
+from app.services.autocomplete import autocomplete_index
+from app.services.idempotency import idempotency_key_cleaner
+from app.services.sales_rollup import sales_reconciler
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -11,6 +17,16 @@ app = FastAPI(
     version="0.1.0",
 )
 
+# Inside CORS, so replayed responses get the CORS headers too
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=[
+        f"{settings.API_V1_STR}/orders/",
+        f"{settings.API_V1_STR}/addresses/",
+        f"{settings.API_V1_STR}/users/",
+    ],
+)
+
 # Настройка CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +41,17 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.on_event("startup")
 async def startup_event():
     await create_first_superuser()
+    await change_listener.start()
+    await autocomplete_index.build()
+    sales_reconciler.start()
+    idempotency_key_cleaner.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await change_listener.stop()
+    await sales_reconciler.stop()
+    await idempotency_key_cleaner.stop()
+    password_hasher.shutdown()
 
 @app.get("/")
 async def root():
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey
+from sqlalchemy import Column, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
 
 
 class Address(Base):
+    __table_args__ = (
+        Index("ix_address_user_id_id", "user_id", "id"),
+    )
+
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
     street = Column(String, nullable=False)
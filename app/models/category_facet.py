@@ -0,0 +1,81 @@
+from sqlalchemy import DDL, Column, Integer, String, event
+
+from app.db.base_class import Base
+from app.models.product import Product
+
+
+class CategoryFacet(Base):
+    """
+    Per-category product counts, maintained by triggers on the product table.
+    """
+
+    category = Column(String, primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    available_count = Column(Integer, nullable=False, default=0)
+    in_stock_count = Column(Integer, nullable=False, default=0)
+
+
+def _apply_changes_sql(changes: str) -> str:
+    """
+    SQL adding the net effect of `changes` (rows of category, is_available,
+    stock_quantity and sign) to the facets. Categories whose counts don't
+    move, like most stock changes, are not written at all, and the rest are
+    written in category order so concurrent statements can't deadlock.
+    """
+    return f"""
+        INSERT INTO {CategoryFacet.__tablename__} AS facet
+            (category, product_count, available_count, in_stock_count)
+        SELECT * FROM (
+            SELECT
+                category,
+                sum(sign) AS product_count,
+                sum(sign * (is_available IS TRUE)::int) AS available_count,
+                sum(sign * (is_available IS TRUE AND stock_quantity > 0)::int)
+                    AS in_stock_count
+            FROM ({changes}) AS changes
+            WHERE category IS NOT NULL
+            GROUP BY category
+        ) AS delta
+        WHERE product_count <> 0 OR available_count <> 0 OR in_stock_count <> 0
+        ORDER BY category
+        ON CONFLICT (category) DO UPDATE SET
+            product_count = facet.product_count + excluded.product_count,
+            available_count = facet.available_count + excluded.available_count,
+            in_stock_count = facet.in_stock_count + excluded.in_stock_count;
+    """
+
+
+_OLD_ROWS = "SELECT category, is_available, stock_quantity, -1 AS sign FROM old_rows"
+_NEW_ROWS = "SELECT category, is_available, stock_quantity, 1 AS sign FROM new_rows"
+
+# Statement-level triggers with transition tables: a bulk import costs one
+# aggregate upsert per statement, not one per product
+_FACET_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {Product.__tablename__}_update_facets() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {_apply_changes_sql(_NEW_ROWS)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {_apply_changes_sql(f"{_OLD_ROWS} UNION ALL {_NEW_ROWS}")}
+    ELSE
+        {_apply_changes_sql(_OLD_ROWS)}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+_TRANSITION_TABLES = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+event.listen(Product.__table__, "after_create", DDL(_FACET_FUNCTION))
+for _operation, _tables in _TRANSITION_TABLES.items():
+    event.listen(Product.__table__, "after_create", DDL(
+        f"CREATE TRIGGER {Product.__tablename__}_facets_{_operation.lower()} "
+        f"AFTER {_operation} ON {Product.__tablename__} REFERENCING {_tables} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION {Product.__tablename__}_update_facets()"
+    ))
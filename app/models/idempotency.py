@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, func
+
+from app.db.base_class import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a POST sent with an Idempotency-Key, replayed to retries of
+    the same request until it expires. Until the response is stored the
+    key is claimed by the request in flight, up to `locked_until`.
+    """
+
+    # Principal ID, or for anonymous requests a hash of the client address
+    # and request
+    owner = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    # Identifies the request holding the key, so only it stores or drops it
+    claim = Column(String, nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
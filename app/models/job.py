@@ -0,0 +1,41 @@
+from enum import Enum as PyEnum
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base_class import Base
+
+
+class JobStatus(str, PyEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    # Out of attempts; kept for inspection until requeued or deleted
+    DEAD = "dead"
+
+
+# Spelled out rather than bound, so the planner can match the partial index
+CLAIMABLE = text("status <> 'DEAD'")
+
+
+class Job(Base):
+    """
+    Background job, enqueued in the transaction of the change that calls for
+    it and claimed by the workers with FOR UPDATE SKIP LOCKED. Finished jobs
+    are deleted.
+    """
+    __table_args__ = (
+        # Only queued and running jobs are ever claimed
+        Index("ix_job_run_at", "run_at", postgresql_where=CLAIMABLE),
+    )
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    # Due time of a queued job, lease expiry of a running one
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
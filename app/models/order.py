@@ -1,8 +1,7 @@
-from datetime import datetime, UTC
 from enum import Enum as PyEnum
 from sqlalchemy import (
     Boolean, Column, String, Float, DateTime,
-    ForeignKey, Integer, Enum
+    ForeignKey, Integer, Enum, Index, func
 )
 from sqlalchemy.orm import relationship
 
@@ -19,13 +18,21 @@ class OrderStatus(str, PyEnum):
 
 
 class Order(Base):
+    __table_args__ = (
+        Index("ix_order_created_at_id", "created_at", "id"),
+        Index("ix_order_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_order_status_created_at_id", "status", "created_at", "id"),
+    )
+    # Server-generated timestamps come back in the INSERT's RETURNING clause
+    __mapper_args__ = {"eager_defaults": True}
+
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
     address_id = Column(String, ForeignKey("address.id"), nullable=False)
     total_amount = Column(Float, nullable=False)
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
-    created_at = Column(DateTime, default=datetime.now(UTC))
-    updated_at = Column(DateTime, default=datetime.now(UTC), onupdate=datetime.now(UTC))
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     delivery_time = Column(DateTime, nullable=True)
     is_paid = Column(Boolean, default=False)
     payment_method = Column(String, nullable=True)
@@ -38,7 +45,7 @@ class Order(Base):
 
 class OrderItem(Base):
     id = Column(String, primary_key=True, index=True)
-    order_id = Column(String, ForeignKey("order.id"), nullable=False)
+    order_id = Column(String, ForeignKey("order.id"), nullable=False, index=True)
     product_id = Column(String, ForeignKey("product.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
@@ -1,20 +1,45 @@
-from datetime import datetime, UTC
-from sqlalchemy import Boolean, Column, String, Float, Text, DateTime, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    DDL, Boolean, Column, Computed, String, Float, Text, DateTime, Integer, Index, event, func
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.base_class import Base
 
+# Text search configuration of Product.search_vector. 'simple' doesn't stem,
+# which keeps matching language-neutral; typos are covered by trigrams.
+SEARCH_CONFIG = "simple"
+
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 
 class Product(Base):
+    __table_args__ = (
+        Index("ix_product_created_at_id", "created_at", "id"),
+        Index("ix_product_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_product_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_product_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
     id = Column(String, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
+    sku = Column(String, unique=True, index=True, nullable=True)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
     image_url = Column(String, nullable=True)
     category = Column(String, index=True, nullable=True)
     is_available = Column(Boolean(), default=True)
     stock_quantity = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.now(UTC))
-    updated_at = Column(DateTime, default=datetime.now(UTC), onupdate=datetime.now(UTC))
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Maintained by Postgres; name terms rank above description terms
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted=True,
+    )))
 
     order_items = relationship("OrderItem", back_populates="product")
@@ -0,0 +1,17 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, String
+
+from app.db.base_class import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Token bucket state shared by all workers. Losing it on a crash only
+    resets the limits, so the table is unlogged to keep writes cheap.
+    """
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    # Outcome of the last take, so one atomic upsert can report it
+    allowed = Column(Boolean, nullable=False)
@@ -0,0 +1,188 @@
+from sqlalchemy import DDL, Column, Date, Enum, Float, Integer, SmallInteger, String, event
+
+from app.db.base_class import Base
+from app.models.order import Order, OrderItem, OrderStatus
+
+# Every order of a day lands on the same (day, status) key, so each key is
+# spread over this many rows, picked by backend PID; readers sum the shards
+SALES_SHARDS = 16
+
+
+class SalesDaily(Base):
+    """
+    Order count, revenue and item volume per day and status, maintained by
+    triggers on the order and order item tables.
+    """
+
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    item_count = Column(Integer, nullable=False, default=0)
+
+
+class ProductSalesDaily(Base):
+    """
+    Units sold, revenue and order lines per day, product and status,
+    maintained by triggers on the order and order item tables.
+    """
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(String, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    line_count = Column(Integer, nullable=False, default=0)
+
+
+_ORDER = f'"{Order.__tablename__}"'
+_ITEM = OrderItem.__tablename__
+
+
+def _upsert_daily_sql(deltas: str) -> str:
+    """
+    SQL adding `deltas` (rows of day, status, order_count, revenue and
+    item_count) to this backend's shard of the daily rollup. Keys whose
+    totals don't move are not written, and the rest are written in key
+    order so concurrent statements can't deadlock.
+    """
+    return f"""
+        INSERT INTO {SalesDaily.__tablename__} AS rollup
+            (day, status, shard, order_count, revenue, item_count)
+        SELECT day, status, mod(pg_backend_pid(), {SALES_SHARDS}),
+            order_count, revenue, item_count
+        FROM (
+            SELECT day, status, sum(order_count) AS order_count,
+                sum(revenue) AS revenue, sum(item_count) AS item_count
+            FROM ({deltas}) AS deltas
+            GROUP BY day, status
+        ) AS delta
+        WHERE order_count <> 0 OR revenue <> 0 OR item_count <> 0
+        ORDER BY day, status
+        ON CONFLICT (day, status, shard) DO UPDATE SET
+            order_count = rollup.order_count + excluded.order_count,
+            revenue = rollup.revenue + excluded.revenue,
+            item_count = rollup.item_count + excluded.item_count;
+    """
+
+
+def _upsert_product_sql(deltas: str) -> str:
+    """
+    Same as `_upsert_daily_sql`, for rows of day, product_id, status,
+    quantity, revenue and line_count.
+    """
+    return f"""
+        INSERT INTO {ProductSalesDaily.__tablename__} AS rollup
+            (day, product_id, status, quantity, revenue, line_count)
+        SELECT * FROM (
+            SELECT day, product_id, status, sum(quantity) AS quantity,
+                sum(revenue) AS revenue, sum(line_count) AS line_count
+            FROM ({deltas}) AS deltas
+            GROUP BY day, product_id, status
+        ) AS delta
+        WHERE quantity <> 0 OR revenue <> 0 OR line_count <> 0
+        ORDER BY day, product_id, status
+        ON CONFLICT (day, product_id, status) DO UPDATE SET
+            quantity = rollup.quantity + excluded.quantity,
+            revenue = rollup.revenue + excluded.revenue,
+            line_count = rollup.line_count + excluded.line_count;
+    """
+
+
+def _order_changes_sql(changes: str) -> str:
+    # An order's items are counted under its current day and status, so an
+    # order row moving between keys takes its items along. Orders can't
+    # have items when inserted or deleted (the foreign key sees to that).
+    return (
+        _upsert_daily_sql(f"""
+            SELECT o.created_at::date AS day, o.status, o.sign AS order_count,
+                o.sign * o.total_amount AS revenue,
+                o.sign * coalesce((
+                    SELECT sum(quantity) FROM {_ITEM} WHERE order_id = o.id
+                ), 0) AS item_count
+            FROM ({changes}) AS o
+        """)
+        + _upsert_product_sql(f"""
+            SELECT o.created_at::date AS day, i.product_id, o.status,
+                o.sign * i.quantity AS quantity,
+                o.sign * i.quantity * i.unit_price AS revenue,
+                o.sign AS line_count
+            FROM ({changes}) AS o JOIN {_ITEM} AS i ON i.order_id = o.id
+        """)
+    )
+
+
+def _locked_orders(changes: str) -> str:
+    # Items are counted under their order's day and status as of commit: an
+    # item change waits for a concurrent status change of its order to
+    # commit, then reads the new status (READ COMMITTED re-reads the row)
+    return f"""
+        SELECT id, created_at, status FROM {_ORDER}
+        WHERE id IN (SELECT order_id FROM ({changes}) AS changed)
+        ORDER BY id FOR SHARE
+    """
+
+
+def _item_changes_sql(changes: str) -> str:
+    return (
+        _upsert_daily_sql(f"""
+            SELECT o.created_at::date AS day, o.status, 0 AS order_count,
+                0 AS revenue, i.sign * i.quantity AS item_count
+            FROM ({changes}) AS i JOIN ({_locked_orders(changes)}) AS o
+                ON o.id = i.order_id
+        """)
+        + _upsert_product_sql(f"""
+            SELECT o.created_at::date AS day, i.product_id, o.status,
+                i.sign * i.quantity AS quantity,
+                i.sign * i.quantity * i.unit_price AS revenue,
+                i.sign AS line_count
+            FROM ({changes}) AS i JOIN ({_locked_orders(changes)}) AS o
+                ON o.id = i.order_id
+        """)
+    )
+
+
+def _trigger_function(name: str, apply_sql, columns: str) -> str:
+    old_rows = f"SELECT {columns}, -1 AS sign FROM old_rows"
+    new_rows = f"SELECT {columns}, 1 AS sign FROM new_rows"
+    return f"""
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {apply_sql(new_rows)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {apply_sql(f"{old_rows} UNION ALL {new_rows}")}
+    ELSE
+        {apply_sql(old_rows)}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+_TRANSITION_TABLES = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+# Statement-level triggers, as for the category facets: one upsert per
+# statement and rollup, however many rows it touches
+for _table, _name, _apply_sql, _columns in (
+        (Order.__table__, "order_update_sales", _order_changes_sql,
+         "id, created_at, status, total_amount"),
+        (OrderItem.__table__, "orderitem_update_sales", _item_changes_sql,
+         "order_id, product_id, quantity, unit_price"),
+):
+    event.listen(_table, "after_create", DDL(
+        _trigger_function(_name, _apply_sql, _columns)
+    ))
+    for _operation, _tables in _TRANSITION_TABLES.items():
+        event.listen(_table, "after_create", DDL(
+            f"CREATE TRIGGER {_name}_{_operation.lower()} "
+            f'AFTER {_operation} ON "{_table.name}" REFERENCING {_tables} '
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {_name}()"
+        ))
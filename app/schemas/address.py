@@ -1,15 +1,18 @@
 from typing import Optional
-from datetime import datetime
 from pydantic import BaseModel
 
 
 class AddressBase(BaseModel):
     street: str
     city: str
-    state: Optional[str] = None
-    zip_code: str
+    state: str
+    postal_code: str
     country: str = "Россия"
     is_default: bool = False
+    apartment: Optional[str] = None
+    floor: Optional[str] = None
+    entrance: Optional[str] = None
+    notes: Optional[str] = None
 
 
 class AddressCreate(AddressBase):
@@ -20,16 +23,18 @@ class AddressUpdate(BaseModel):
     street: Optional[str] = None
     city: Optional[str] = None
     state: Optional[str] = None
-    zip_code: Optional[str] = None
+    postal_code: Optional[str] = None
     country: Optional[str] = None
     is_default: Optional[bool] = None
+    apartment: Optional[str] = None
+    floor: Optional[str] = None
+    entrance: Optional[str] = None
+    notes: Optional[str] = None
 
 
 class AddressInDBBase(AddressBase):
-    id: int
-    user_id: int
-    created_at: datetime
-    updated_at: Optional[datetime] = None
+    id: str
+    user_id: str
 
     class Config:
         from_attributes = True
@@ -0,0 +1,51 @@
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+from app.core.serialization import ResponseAdapter
+from app.schemas.common import Page
+
+
+class Fieldset:
+    """
+    The fields of a response schema a client asked for (`?fields=a,b`),
+    with the trimmed schema's serializers for one record and for a page.
+    """
+
+    def __init__(self, schema: Type[BaseModel], fields: Tuple[str, ...]):
+        self.fields = fields
+        self.schema = create_model(
+            f"{schema.__name__}Fields",
+            __config__=ConfigDict(from_attributes=True),
+            **{
+                name: (field.annotation, field)
+                for name, field in schema.model_fields.items()
+                if name in fields
+            },
+        )
+        self.item = ResponseAdapter(self.schema)
+        self.page = ResponseAdapter(Page[self.schema])
+
+
+@lru_cache(maxsize=256)
+def _fieldset(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Fieldset:
+    return Fieldset(schema, fields)
+
+
+def parse_fieldset(schema: Type[BaseModel], fields: Optional[str]) -> Optional[Fieldset]:
+    """
+    Parse a comma-separated list of `schema`'s fields; None means all of
+    them. The ID is always included.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(schema.model_fields))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    requested.add("id")
+    # Schema order, so every spelling of a fieldset shares one schema
+    return _fieldset(
+        schema, tuple(name for name in schema.model_fields if name in requested)
+    )
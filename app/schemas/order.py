@@ -1,13 +1,14 @@
+from enum import Enum
 from typing import Optional, List
-from datetime import datetime
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field
 
 from app.models.order import OrderStatus
 from app.schemas.order_detail import OrderDetail, OrderDetailCreate
 
 
 class OrderBase(BaseModel):
-    address_id: int
+    address_id: str
     total_amount: float
     status: OrderStatus = OrderStatus.PENDING
     delivery_fee: float = 0.0
@@ -15,12 +16,19 @@ class OrderBase(BaseModel):
     special_instructions: Optional[str] = None
 
 
-class OrderCreate(OrderBase):
-    order_details: List[OrderDetailCreate]
+class OrderItemCreate(BaseModel):
+    product_id: str
+    quantity: int = Field(gt=0)
+
+
+class OrderCreate(BaseModel):
+    address_id: str
+    payment_method: Optional[str] = None
+    items: List[OrderItemCreate] = Field(min_length=1)
 
 
 class OrderUpdate(BaseModel):
-    address_id: Optional[int] = None
+    address_id: Optional[str] = None
     total_amount: Optional[float] = None
     status: Optional[OrderStatus] = None
     delivery_fee: Optional[float] = None
@@ -28,9 +36,32 @@ class OrderUpdate(BaseModel):
     special_instructions: Optional[str] = None
 
 
+class OrderExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class OrderStatusEvent(BaseModel):
+    order_id: str
+    user_id: str
+    status: OrderStatus
+    previous_status: Optional[OrderStatus] = None
+    changed_at: datetime
+
+
+class OrderItem(BaseModel):
+    id: str
+    product_id: str
+    quantity: int
+    unit_price: float
+
+    class Config:
+        from_attributes = True
+
+
 class OrderInDBBase(OrderBase):
-    id: int
-    user_id: int
+    id: str
+    user_id: str
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -40,3 +71,32 @@ class OrderInDBBase(OrderBase):
 
 class Order(OrderInDBBase):
     order_details: List[OrderDetail] = []
+    items: List[OrderItem] = []
+
+
+class SalesTotals(BaseModel):
+    order_count: int
+    revenue: float
+    item_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class DailySales(SalesTotals):
+    day: date
+
+
+class StatusSales(SalesTotals):
+    status: OrderStatus
+
+
+class ProductSales(BaseModel):
+    product_id: str
+    name: Optional[str] = None
+    quantity: int
+    revenue: float
+    line_count: int
+
+    class Config:
+        from_attributes = True
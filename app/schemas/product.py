@@ -1,6 +1,7 @@
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ProductBase(BaseModel):
@@ -10,6 +11,7 @@ class ProductBase(BaseModel):
     image_url: Optional[str] = None
     category: Optional[str] = None
     is_available: bool = True
+    sku: Optional[str] = None
 
 
 class ProductCreate(ProductBase):
@@ -23,10 +25,11 @@ class ProductUpdate(BaseModel):
     image_url: Optional[str] = None
     category: Optional[str] = None
     is_available: Optional[bool] = None
+    sku: Optional[str] = None
 
 
 class ProductInDBBase(ProductBase):
-    id: int
+    id: str
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -36,3 +39,43 @@ class ProductInDBBase(ProductBase):
 
 class Product(ProductInDBBase):
     pass
+
+
+class ProductSuggestion(BaseModel):
+    id: str
+    name: str
+    category: Optional[str] = None
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    product_count: int
+    available_count: int
+    in_stock_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class ProductImportKey(str, Enum):
+    SKU = "sku"
+    NAME = "name"
+
+
+class ProductImportRow(ProductBase):
+    price: float = Field(ge=0, allow_inf_nan=False)
+    # None keeps the stored stock of an existing product (0 for new ones);
+    # bounded by the column's integer type
+    stock_quantity: Optional[int] = Field(None, ge=0, le=2 ** 31 - 1)
+
+
+class ProductImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ProductImportError] = []
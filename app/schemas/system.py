@@ -0,0 +1,44 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    acquisitions: int
+    timeouts: int
+    wait_total_seconds: float
+    wait_max_seconds: float
+    wait_avg_seconds: float
+
+
+class CacheStatus(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+class CatalogCacheStatus(BaseModel):
+    products: CacheStatus
+    pages: CacheStatus
+
+
+class PoolsStatus(BaseModel):
+    primary: PoolStatus
+    replica: Optional[PoolStatus] = None
+
+
+class JobQueueStatus(BaseModel):
+    queued: int
+    running: int
+    dead: int
+    # How long the oldest due job has been waiting for a worker
+    oldest_due_seconds: float
@@ -25,8 +25,8 @@ class UserUpdate(BaseModel):
 
 
 class UserInDBBase(UserBase):
-    id: int
-    created_at: datetime
+    id: str
+    created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
     class Config:
@@ -34,7 +34,21 @@ class UserInDBBase(UserBase):
 
 
 class User(UserInDBBase):
-    pass
+    # Validated on the way in; re-checking stored addresses on every
+    # response costs more than the rest of the serialization
+    email: str
+
+
+class Principal(BaseModel):
+    """
+    What authorization needs to know about the authenticated user.
+    """
+    id: str
+    is_active: bool = True
+    is_superuser: bool = False
+
+    class Config:
+        from_attributes = True
 
 
 class UserInDB(UserInDBBase):
@@ -0,0 +1,338 @@
+import asyncio
+import heapq
+import logging
+import re
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.db.changes import on_change
+from app.db.session import AsyncSessionLocal
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+# Upper bound of a slot rank; ranks of removed slots
+_WORST_RANK = 0xFFFFFFFF
+# Prefixes up to this length match too many terms to merge their postings
+# per keystroke, so their best slots are kept precomputed
+_SHORT_PREFIX = 3
+_TOP_SIZE = 100
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+
+def short_prefixes(terms: Iterable[str]) -> Set[str]:
+    return {
+        term[:length]
+        for term in terms
+        for length in range(1, min(len(term), _SHORT_PREFIX) + 1)
+    }
+
+
+class ProductRow:
+    __slots__ = ("id", "name", "category", "in_stock")
+
+    def __init__(self, id: str, name: str, category: Optional[str], in_stock: bool):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.in_stock = in_stock
+
+    @property
+    def rank(self) -> int:
+        return (0 if self.in_stock else 1 << 16) | min(len(self.name), 0xFFFF)
+
+
+class AutocompleteIndex:
+    """
+    In-process prefix index over product names and categories.
+
+    Every product occupies a slot (a small int). The vocabulary is a sorted
+    list of terms, each with a postings array of slots ordered by rank
+    (in-stock first, then shorter names), so a prefix is a bisect on the
+    vocabulary followed by a lazy merge of the matching postings that stops
+    after `limit` results. Prefixes of up to _SHORT_PREFIX characters are
+    answered from `top` instead: the best slots of each such prefix, kept
+    exact as products come and go and refilled from the postings when they
+    run short.
+
+    The index is built once at startup and then follows product changes:
+    changed IDs are reloaded in the background after each commit, and an
+    "anything changed" event triggers a full rebuild.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+        self._pending: Set[str] = set()
+        self._rebuild_requested = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _reset(self) -> None:
+        self.terms: List[str] = []
+        self.postings: Dict[str, array] = {}
+        self.top: Dict[str, array] = {}
+        # Short prefixes whose `top` list holds every matching slot
+        self.complete: Set[str] = set()
+        self.ids: List[Optional[str]] = []
+        self.names: List[Optional[str]] = []
+        self.categories: List[str] = []
+        self.category_of = array("I")
+        self.ranks = array("I")
+        self.slots: Dict[str, int] = {}
+        self._category_ids: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @staticmethod
+    def _terms_of(name: str, category: Optional[str]) -> Set[str]:
+        terms = set(tokenize(name)) | set(tokenize(category))
+        if category:
+            terms.add(category.lower())
+        return terms
+
+    def _category_id(self, category: Optional[str]) -> int:
+        category = category or ""
+        category_id = self._category_ids.get(category)
+        if category_id is None:
+            category_id = self._category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return category_id
+
+    def _store(self, slot: int, row: ProductRow) -> None:
+        rank = row.rank
+        if slot == len(self.ids):
+            self.ids.append(row.id)
+            self.names.append(row.name)
+            self.category_of.append(self._category_id(row.category))
+            self.ranks.append(rank)
+        else:
+            self.ids[slot] = row.id
+            self.names[slot] = row.name
+            self.category_of[slot] = self._category_id(row.category)
+            self.ranks[slot] = rank
+        self.slots[row.id] = slot
+
+    def load(self, rows: Iterable[ProductRow]) -> None:
+        """
+        Replace the whole index with `rows`.
+        """
+        self._reset()
+        # Slots are handed out in rank order, so appending keeps every
+        # postings and top list sorted
+        postings: Dict[str, array] = {}
+        top: Dict[str, array] = {}
+        for row in sorted(rows, key=lambda row: row.rank):
+            slot = len(self.ids)
+            self._store(slot, row)
+            terms = self._terms_of(row.name, row.category)
+            for term in terms:
+                slots = postings.get(term)
+                if slots is None:
+                    slots = postings[term] = array("I")
+                slots.append(slot)
+            for prefix in short_prefixes(terms):
+                slots = top.get(prefix)
+                if slots is None:
+                    slots = top[prefix] = array("I")
+                if len(slots) < _TOP_SIZE:
+                    slots.append(slot)
+        self.postings = postings
+        self.top = top
+        self.complete = {prefix for prefix, slots in top.items() if len(slots) < _TOP_SIZE}
+        self.terms = sorted(postings)
+
+    def upsert(self, row: ProductRow) -> None:
+        slot = self.slots.get(row.id)
+        if slot is not None:
+            self._unlink(slot)
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self.ids)
+        self._store(slot, row)
+        ranks = self.ranks
+        rank = ranks[slot]
+        terms = self._terms_of(row.name, row.category)
+        for term in terms:
+            slots = self.postings.get(term)
+            if slots is None:
+                slots = self.postings[term] = array("I")
+                insort(self.terms, term)
+            slots.insert(bisect_left(slots, rank, key=ranks.__getitem__), slot)
+        for prefix in short_prefixes(terms):
+            slots = self.top.get(prefix)
+            if slots is None:
+                self.top[prefix] = array("I", [slot])
+                self.complete.add(prefix)
+                continue
+            position = bisect_left(slots, rank, key=ranks.__getitem__)
+            # Past the end of an incomplete list, better slots may be missing
+            if position < len(slots) or prefix in self.complete:
+                slots.insert(position, slot)
+                if len(slots) > _TOP_SIZE:
+                    slots.pop()
+                    self.complete.discard(prefix)
+
+    def remove(self, product_id: str) -> None:
+        slot = self.slots.pop(product_id, None)
+        if slot is None:
+            return
+        self._unlink(slot)
+        self.ids[slot] = None
+        self.names[slot] = None
+        self.ranks[slot] = _WORST_RANK
+        self._free.append(slot)
+
+    def _unlink(self, slot: int) -> None:
+        category = self.categories[self.category_of[slot]]
+        terms = self._terms_of(self.names[slot], category or None)
+        for term in terms:
+            slots = self.postings[term]
+            slots.remove(slot)
+            if not slots:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+        for prefix in short_prefixes(terms):
+            slots = self.top[prefix]
+            if slot in slots:
+                slots.remove(slot)
+            if not slots and prefix in self.complete:
+                del self.top[prefix]
+                self.complete.discard(prefix)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Tuple[str, str, Optional[str]]]:
+        """
+        Return (id, name, category) of the best products whose terms start
+        with every word of `query`.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        prefix, required = words[-1], words[:-1]
+        if len(prefix) <= _SHORT_PREFIX:
+            top = self.top.get(prefix)
+            if top is None:
+                return []
+            results = self._collect(top, required, limit)
+            if len(results) >= limit or prefix in self.complete:
+                return results
+            if len(top) < _TOP_SIZE:
+                self._refill(prefix)
+        return self._collect(self._matches(prefix), required, limit)
+
+    def _matches(self, prefix: str) -> Iterator[int]:
+        """
+        Every slot with a term starting with `prefix`, best first.
+        """
+        start = bisect_left(self.terms, prefix)
+        stop = bisect_left(self.terms, prefix + "\U0010ffff", start)
+        return heapq.merge(
+            *(self.postings[term] for term in self.terms[start:stop]),
+            key=self.ranks.__getitem__,
+        )
+
+    def _refill(self, prefix: str) -> None:
+        slots = array("I")
+        seen = set()
+        for slot in self._matches(prefix):
+            if slot not in seen:
+                seen.add(slot)
+                slots.append(slot)
+                if len(slots) > _TOP_SIZE:
+                    slots.pop()
+                    self.complete.discard(prefix)
+                    break
+        else:
+            self.complete.add(prefix)
+        self.top[prefix] = slots
+
+    def _collect(
+            self, matches: Iterable[int], required: List[str], limit: int
+    ) -> List[Tuple[str, str, Optional[str]]]:
+        # A word starts a term exactly where it follows a word boundary
+        patterns = [
+            re.compile(r"\b" + re.escape(word), re.IGNORECASE) for word in required
+        ]
+        results = []
+        seen = set()
+        for slot in matches:
+            if slot in seen:
+                continue
+            seen.add(slot)
+            name = self.names[slot]
+            category = self.categories[self.category_of[slot]] or None
+            if patterns:
+                text = f"{name} {category}" if category else name
+                if not all(pattern.search(text) for pattern in patterns):
+                    continue
+            results.append((self.ids[slot], name, category))
+            if len(results) >= limit:
+                break
+        return results
+
+    async def build(self) -> None:
+        """
+        (Re)load the whole index from the product table.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(
+                    Product.id, Product.name, Product.category,
+                    Product.is_available & (Product.stock_quantity > 0),
+                ).execution_options(yield_per=10000)
+            )
+            rows = [ProductRow(*row) async for row in result]
+        self.load(rows)
+
+    async def refresh(self, product_ids: Iterable[str]) -> None:
+        product_ids = list(product_ids)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    Product.id, Product.name, Product.category,
+                    Product.is_available & (Product.stock_quantity > 0),
+                ).where(Product.id.in_(product_ids))
+            )
+            rows = [ProductRow(*row) for row in result.all()]
+        for row in rows:
+            self.upsert(row)
+        for product_id in set(product_ids) - {row.id for row in rows}:
+            self.remove(product_id)
+
+    def on_products_changed(self, product_ids: Optional[Set[str]]) -> None:
+        if product_ids is None:
+            self._rebuild_requested = True
+        else:
+            self._pending.update(product_ids)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(
+                self._apply_changes()
+            )
+
+    async def _apply_changes(self) -> None:
+        # Changes arriving while a batch loads are picked up by the next pass
+        while self._rebuild_requested or self._pending:
+            try:
+                if self._rebuild_requested:
+                    self._rebuild_requested = False
+                    self._pending.clear()
+                    await self.build()
+                else:
+                    product_ids, self._pending = self._pending, set()
+                    await self.refresh(product_ids)
+            except Exception:
+                logger.exception("Failed to update the autocomplete index")
+                self._rebuild_requested = True
+                await asyncio.sleep(1)
+
+
+autocomplete_index = AutocompleteIndex()
+on_change(Product.__tablename__, autocomplete_index.on_products_changed)
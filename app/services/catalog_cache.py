@@ -0,0 +1,154 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_cache import Representation
+from app.core.serialization import ResponseAdapter
+from app.crud import crud_product
+from app.db.changes import on_change
+from app.db.session import AsyncSessionLocal, ReplicaSessionLocal
+from app.models.product import Product as ProductModel
+from app.schemas.common import Page
+from app.schemas.fieldsets import Fieldset
+from app.schemas.product import CategoryFacet, Product
+
+_PRODUCT = ResponseAdapter(Product)
+_PRODUCT_PAGE = ResponseAdapter(Page[Product])
+_FACETS = ResponseAdapter(List[CategoryFacet])
+
+
+class CatalogCache:
+    """
+    Per-worker cache of product reads, holding serialized responses.
+
+    Entries are dropped as soon as a transaction changing the product commits
+    on any worker (see app.db.listener); the TTL is only a safety net. Any
+    product change drops every cached list page, since a single product can
+    move across pages, and every sparse fieldset read.
+
+    Misses are loaded each in its own session from `session_factory`, the
+    primary by default (see CATALOG_CACHE_FROM_REPLICA).
+    """
+
+    def __init__(
+            self, ttl: float, max_products: int, max_pages: int, session_factory: Any
+    ):
+        self.products = TTLCache(maxsize=max_products, ttl=ttl)
+        self.pages = TTLCache(maxsize=max_pages, ttl=ttl)
+        self.session_factory = session_factory
+
+    async def get_product(
+            self, product_id: Any, fieldset: Optional[Fieldset] = None
+    ) -> Optional[Representation]:
+        if fieldset is not None:
+            return await self._get_product_fields(product_id, fieldset)
+
+        async with self.session_factory() as db:
+            return await self._get_product(db, product_id)
+
+    async def _get_product(self, db: AsyncSession, product_id: Any) -> Optional[Representation]:
+        async def load() -> Optional[Representation]:
+            product = await crud_product.loader(db).load(product_id)
+            if not product:
+                return None
+            return Representation(_PRODUCT.dump_json(product))
+
+        return await self.products.get_or_load(str(product_id), load)
+
+    async def _get_product_fields(
+            self, product_id: Any, fieldset: Fieldset
+    ) -> Optional[Representation]:
+        # Keyed by more than the product ID, so invalidated with the pages
+        async def load() -> Optional[Representation]:
+            async with self.session_factory() as db:
+                product = await crud_product.get(
+                    db, id=product_id, options=crud_product.fields_options(fieldset.fields)
+                )
+                if not product:
+                    return None
+                return Representation(fieldset.item.dump_json(product))
+
+        return await self.pages.get_or_load(
+            ("product", str(product_id), fieldset.fields), load
+        )
+
+    async def get_products(self, product_ids: Sequence[Any]) -> Representation:
+        """
+        The products with `product_ids` as one JSON array, in the order
+        asked for, leaving out duplicates and unknown IDs. Cached products
+        cost nothing; the rest are fetched with a single query.
+        """
+        # The session only connects if some product isn't cached
+        async with self.session_factory() as db:
+            products = await asyncio.gather(*(
+                self._get_product(db, product_id)
+                for product_id in dict.fromkeys(str(id) for id in product_ids)
+            ))
+        return Representation(
+            b"[" + b",".join(product.body for product in products if product) + b"]"
+        )
+
+    async def get_page(
+            self,
+            *,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            category: Optional[str] = None,
+            fieldset: Optional[Fieldset] = None
+    ) -> Representation:
+        options = crud_product.fields_options(fieldset.fields) if fieldset else ()
+        adapter = fieldset.page if fieldset else _PRODUCT_PAGE
+
+        async def load() -> Representation:
+            async with self.session_factory() as db:
+                if category is None:
+                    products, next_cursor = await crud_product.get_multi(
+                        db, cursor=cursor, limit=limit, options=options
+                    )
+                else:
+                    products, next_cursor = await crud_product.get_by_category(
+                        db, category=category, cursor=cursor, limit=limit, options=options
+                    )
+                return Representation(adapter.dump_json(
+                    {"items": products, "next_cursor": next_cursor}
+                ))
+
+        return await self.pages.get_or_load(
+            (cursor, limit, category, fieldset.fields if fieldset else None), load
+        )
+
+    async def get_facets(self) -> Representation:
+        async def load() -> Representation:
+            async with self.session_factory() as db:
+                facets = await crud_product.get_category_facets(db)
+                return Representation(_FACETS.dump_json(facets))
+
+        return await self.pages.get_or_load("facets", load)
+
+    def invalidate(self, product_ids: Optional[Set[str]]) -> None:
+        if product_ids is None:
+            self.products.clear()
+        else:
+            for product_id in product_ids:
+                self.products.delete(product_id)
+        self.pages.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "products": self.products.stats_dict(),
+            "pages": self.pages.stats_dict(),
+        }
+
+
+catalog_cache = CatalogCache(
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    max_products=settings.CATALOG_CACHE_MAX_PRODUCTS,
+    max_pages=settings.CATALOG_CACHE_MAX_PAGES,
+    session_factory=(
+        ReplicaSessionLocal if settings.CATALOG_CACHE_FROM_REPLICA else AsyncSessionLocal
+    ),
+)
+on_change(ProductModel.__tablename__, catalog_cache.invalidate)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import delete, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+
+async def claim_key(
+        owner: str, key: str, request_hash: str, *, lock: float, ttl: float
+) -> Tuple[Optional[str], Optional[IdempotencyKey]]:
+    """
+    Claim `key` for a request about to run. Returns the claim, or, when the
+    key is held by a request in flight or already answered, its record.
+
+    An expired key, or one whose request didn't finish within `lock`
+    seconds (its worker died), is taken over.
+    """
+    claim = uuid4().hex
+    table = IdempotencyKey.__table__
+    stmt = insert(table).values(
+        owner=owner,
+        key=key,
+        request_hash=request_hash,
+        claim=claim,
+        locked_until=func.now() + timedelta(seconds=lock),
+        expires_at=func.now() + timedelta(seconds=ttl),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.owner, table.c.key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "claim": stmt.excluded.claim,
+            "locked_until": stmt.excluded.locked_until,
+            "status_code": None,
+            "content_type": None,
+            "body": None,
+            "created_at": func.now(),
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=or_(
+            table.c.expires_at <= func.now(),
+            table.c.locked_until <= func.now(),
+        ),
+    ).returning(table.c.claim)
+    async with AsyncSessionLocal() as db:
+        claimed = await db.scalar(stmt)
+        record = None
+        if claimed is None:
+            record = await db.scalar(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.owner == owner, IdempotencyKey.key == key
+                )
+            )
+        await db.commit()
+    if claimed is None and record is None:
+        # Released between the two statements: try again
+        return await claim_key(owner, key, request_hash, lock=lock, ttl=ttl)
+    return claimed, record
+
+
+async def store_response(
+        owner: str, key: str, claim: str, status_code: int, content_type: str, body: bytes
+) -> None:
+    """
+    Record the response of the request holding `claim`, for replay.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.owner == owner,
+                IdempotencyKey.key == key,
+                IdempotencyKey.claim == claim,
+            )
+            .values(
+                status_code=status_code,
+                content_type=content_type,
+                body=body,
+                locked_until=None,
+            )
+        )
+        await db.commit()
+
+
+async def release_key(owner: str, key: str, claim: str) -> None:
+    """
+    Drop the claim of a request that failed, so a retry runs it again.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.owner == owner,
+                IdempotencyKey.key == key,
+                IdempotencyKey.claim == claim,
+            )
+        )
+        await db.commit()
+
+
+class IdempotencyKeyCleaner:
+    """
+    Background task deleting expired idempotency keys, `batch_size` rows
+    per transaction. Every worker runs it; batches skip the rows another
+    worker is deleting.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def cleanup(self) -> int:
+        """
+        Delete every expired key. Returns how many were deleted.
+        """
+        stmt = text(f"""
+            DELETE FROM {IdempotencyKey.__tablename__} WHERE ctid = ANY(ARRAY(
+                SELECT ctid FROM {IdempotencyKey.__tablename__}
+                WHERE expires_at <= now()
+                LIMIT :batch_size FOR UPDATE SKIP LOCKED
+            ))
+        """)
+        deleted = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(stmt, {"batch_size": self.batch_size})
+                await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < self.batch_size:
+                return deleted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.cleanup()
+            except Exception:
+                logger.exception("Failed to clean up idempotency keys")
+
+
+idempotency_key_cleaner = IdempotencyKeyCleaner(
+    interval=settings.IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS,
+    batch_size=settings.IDEMPOTENCY_CLEANUP_BATCH_SIZE,
+)
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import random
+import traceback
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.job import CLAIMABLE, Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Handlers get a session and the job's payload
+JobHandler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[None]]
+
+_ENQUEUED_KEY = "jobs_enqueued"
+_handlers: Dict[str, JobHandler] = {}
+# Tracebacks longer than this are cut from the front
+_MAX_ERROR_LENGTH = 4000
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register the decorated coroutine as the handler of `kind` jobs.
+
+    Its writes commit together with the job's removal from the queue, so
+    they happen at most once even if the job runs again. Anything it does
+    outside the database may be repeated and should be idempotent.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(
+        db: AsyncSession,
+        kind: str,
+        payload: Dict[str, Any],
+        *,
+        delay: float = 0.0,
+        max_attempts: Optional[int] = None
+) -> Job:
+    """
+    Add a job to the current transaction of `db`: workers see it, and are
+    woken up for it, only once that commits, and never if it rolls back.
+    """
+    job = Job(
+        id=str(uuid4()),
+        kind=kind,
+        payload=payload,
+        status=JobStatus.QUEUED,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if delay:
+        job.run_at = func.now() + timedelta(seconds=delay)
+    db.add(job)
+    db.info[_ENQUEUED_KEY] = True
+    return job
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_workers(session: Session) -> None:
+    # One NOTIFY per transaction, however many jobs it enqueued
+    if session.in_nested_transaction() or not session.info.pop(_ENQUEUED_KEY, False):
+        return
+    session.execute(select(func.pg_notify(settings.JOB_QUEUE_CHANNEL, "")))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_enqueued(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(_ENQUEUED_KEY, None)
+
+
+async def claim_jobs(limit: int, lease: float) -> List[Job]:
+    """
+    Take up to `limit` due jobs, oldest first, for `lease` seconds. Rows
+    locked by another worker's claim are skipped rather than waited for.
+    A running job whose lease expired is due again.
+    """
+    claimable = (
+        select(Job.id)
+        .where(CLAIMABLE, Job.run_at <= func.now())
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id.in_(claimable.scalar_subquery()))
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            run_at=func.now() + timedelta(seconds=lease),
+        )
+        .returning(Job)
+    )
+    async with AsyncSessionLocal() as db:
+        jobs = list((await db.scalars(stmt)).all())
+        await db.commit()
+    return jobs
+
+
+def retry_delay(attempts: int, base: float, maximum: float) -> float:
+    """
+    Exponential backoff with jitter, so jobs failing together don't all
+    come back at once.
+    """
+    return min(maximum, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class JobWorker:
+    """
+    Runs up to `concurrency` jobs at a time, claiming more as slots free up.
+
+    Workers are woken by the NOTIFY sent when jobs are enqueued and when
+    their own retries come due, and poll every `poll_interval` seconds for
+    anything else coming due. A failed job is
+    retried with exponential backoff until it has used `max_attempts`, then
+    marked dead.
+    """
+
+    def __init__(
+            self,
+            concurrency: int,
+            poll_interval: float,
+            lease: float,
+            retry_base: float,
+            retry_max: float
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def wake(self, *args: Any) -> None:
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        """
+        Stop claiming jobs; `run` returns once the running ones finish.
+        """
+        self._stopping = True
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        while not self._stopping:
+            # Cleared before claiming, so a NOTIFY arriving meanwhile isn't lost
+            self._wakeup.clear()
+            free = self.concurrency - len(self._running)
+            if free > 0:
+                try:
+                    jobs = await claim_jobs(free, self.lease)
+                except Exception:
+                    logger.exception("Failed to claim jobs")
+                    jobs = []
+                for job in jobs:
+                    task = asyncio.create_task(self._execute(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._finished)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        if self._running:
+            await asyncio.wait(self._running)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _execute(self, job: Job) -> None:
+        handler = _handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for {job.kind} jobs")
+            if job.attempts > job.max_attempts:
+                # Only a lease running out gets a job here
+                raise TimeoutError("Lease expired on the last attempt")
+            async with AsyncSessionLocal() as db:
+                # Past the lease another worker may take the job over
+                await asyncio.wait_for(handler(db, job.payload), self.lease)
+                # Matching the attempt fences off a worker whose lease ran
+                # out: its removal, and with it the handler's writes, fail
+                result = await db.execute(
+                    delete(Job).where(Job.id == job.id, Job.attempts == job.attempts)
+                )
+                if result.rowcount:
+                    await db.commit()
+                else:
+                    await db.rollback()
+                    logger.warning("Lost the lease of %s job %s", job.kind, job.id)
+        except Exception:
+            logger.exception("%s job %s failed (attempt %s)", job.kind, job.id, job.attempts)
+            await self._fail(job, traceback.format_exc()[-_MAX_ERROR_LENGTH:])
+
+    async def _fail(self, job: Job, error: str) -> None:
+        dead = job.attempts >= job.max_attempts
+        delay = retry_delay(job.attempts, self.retry_base, self.retry_max)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id == job.id, Job.attempts == job.attempts)
+                    .values(
+                        status=JobStatus.DEAD if dead else JobStatus.QUEUED,
+                        run_at=func.now() + timedelta(seconds=0 if dead else delay),
+                        last_error=error,
+                    )
+                )
+                await db.commit()
+        except Exception:
+            # The lease runs out and the job is retried anyway
+            logger.exception("Failed to record the failure of job %s", job.id)
+            return
+        if not dead:
+            # Short backoffs shouldn't wait for the next poll
+            asyncio.get_running_loop().call_later(delay, self.wake)
+
+
+async def get_queue_status(db: AsyncSession) -> Dict[str, Any]:
+    """
+    Number of jobs per status, and how long the oldest due job has waited.
+    """
+    counts = dict((await db.execute(
+        select(Job.status, func.count()).group_by(Job.status)
+    )).all())
+    oldest_due = await db.scalar(
+        select(func.extract("epoch", func.now() - func.min(Job.run_at))).where(
+            Job.status == JobStatus.QUEUED, Job.run_at <= func.now()
+        )
+    )
+    return {
+        "queued": counts.get(JobStatus.QUEUED, 0),
+        "running": counts.get(JobStatus.RUNNING, 0),
+        "dead": counts.get(JobStatus.DEAD, 0),
+        "oldest_due_seconds": float(oldest_due or 0),
+    }
+
+
+async def requeue_dead_jobs(db: AsyncSession, *, kind: Optional[str] = None) -> int:
+    """
+    Give dead jobs (of `kind`, or all) a fresh set of attempts. Returns how
+    many were requeued.
+    """
+    stmt = (
+        update(Job)
+        .where(Job.status == JobStatus.DEAD)
+        .values(status=JobStatus.QUEUED, attempts=0, run_at=func.now())
+    )
+    if kind is not None:
+        stmt = stmt.where(Job.kind == kind)
+    result = await db.execute(stmt)
+    db.info[_ENQUEUED_KEY] = True
+    return result.rowcount
@@ -0,0 +1,172 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.sse import KEEPALIVE, sse_message
+from app.crud import crud_order
+from app.db.listener import change_listener
+from app.db.session import AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.schemas.order import OrderStatusEvent
+
+# ("order", order ID) or ("user", user ID)
+StreamKey = Tuple[str, str]
+
+# Queued in place of events a subscriber fell behind on: the stream sends a
+# fresh snapshot instead
+RESYNC = object()
+
+
+class Subscription:
+    def __init__(self, hub: "OrderEventHub", key: StreamKey, queue_size: int):
+        self.hub = hub
+        self.key = key
+        self.queue: "asyncio.Queue[Union[OrderStatusEvent, object]]" = asyncio.Queue(
+            queue_size
+        )
+
+    def push(self, item: Union[OrderStatusEvent, object]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def next(self, timeout: float) -> Optional[Union[OrderStatusEvent, object]]:
+        """
+        The next event or RESYNC, or None if nothing arrived within `timeout`.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.hub.unsubscribe(self)
+
+
+class OrderEventHub:
+    """
+    Fans order status events out to the streams open on this worker.
+
+    Events reach every worker through NOTIFY, sent in the transaction that
+    changes the status: subscribers hear about a change only once it has
+    committed, in commit order, and never about one rolled back.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[StreamKey, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, key: StreamKey) -> Subscription:
+        subscription = Subscription(self, key, self.queue_size)
+        self._subscriptions[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.key]
+
+    def publish(self, event: OrderStatusEvent) -> None:
+        for key in (("order", event.order_id), ("user", event.user_id)):
+            for subscription in self._subscriptions.get(key, ()):
+                subscription.push(event)
+
+    def resync_all(self) -> None:
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.push(RESYNC)
+
+    def handle_notification(self, payload: str) -> None:
+        self.publish(OrderStatusEvent.model_validate_json(payload))
+
+    @property
+    def stream_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+async def publish_status_change(
+        db: AsyncSession, order: Order, status: OrderStatus
+) -> None:
+    """
+    Announce that `order` moves to `status`, to every worker's streams once
+    the current transaction commits.
+    """
+    if order.status == status:
+        return
+    event = OrderStatusEvent(
+        order_id=order.id,
+        user_id=order.user_id,
+        status=status,
+        previous_status=order.status,
+        # Naive UTC, like the timestamps stored with orders
+        changed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    await db.execute(select(func.pg_notify(
+        settings.ORDER_EVENTS_CHANNEL, event.model_dump_json()
+    )))
+
+
+async def load_snapshot(
+        *, order_id: Optional[str] = None, user_id: Optional[str] = None
+) -> List[OrderStatusEvent]:
+    """
+    Current status of an order, or of a user's active orders, as events.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = await crud_order.get_statuses(
+            db, order_id=order_id, user_id=user_id, active_only=order_id is None
+        )
+    return [
+        OrderStatusEvent(
+            order_id=row.id,
+            user_id=row.user_id,
+            status=row.status,
+            changed_at=row.updated_at or row.created_at,
+        )
+        for row in rows
+    ]
+
+
+async def stream_events(
+        key: StreamKey,
+        snapshot: Callable[[], Awaitable[List[OrderStatusEvent]]],
+        keepalive: float = settings.ORDER_EVENTS_KEEPALIVE_SECONDS,
+) -> AsyncIterator[bytes]:
+    """
+    Body of an event stream: the current state, then every status change as
+    it commits. Subscribing comes first, so no change can slip in between.
+    A subscriber that falls behind, or misses events while the listener
+    reconnects, gets a fresh snapshot.
+    """
+    with order_event_hub.subscribe(key) as subscription:
+        item: Optional[Union[OrderStatusEvent, object]] = RESYNC
+        while True:
+            if item is RESYNC:
+                for event in await snapshot():
+                    yield sse_message(event.model_dump_json(), event="status")
+            elif item is None:
+                yield KEEPALIVE
+            else:
+                yield sse_message(item.model_dump_json(), event="status")
+            item = await subscription.next(keepalive)
+
+
+order_event_hub = OrderEventHub(queue_size=settings.ORDER_EVENTS_QUEUE_SIZE)
+change_listener.listen(
+    settings.ORDER_EVENTS_CHANNEL,
+    order_event_hub.handle_notification,
+    on_reconnect=order_event_hub.resync_all,
+)
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy import Row
+
+from app.schemas.order import OrderExportFormat
+
+MEDIA_TYPES = {
+    OrderExportFormat.NDJSON: "application/x-ndjson",
+    OrderExportFormat.CSV: "text/csv",
+}
+
+ORDER_FIELDS = (
+    "id", "user_id", "address_id", "status", "total_amount", "is_paid",
+    "payment_method", "delivery_time", "created_at", "updated_at",
+)
+ITEM_FIELDS = ("item_id", "product_id", "quantity", "unit_price")
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _order(row: Row) -> Dict[str, Any]:
+    order = {name: _value(getattr(row, name)) for name in ORDER_FIELDS}
+    order["items"] = []
+    return order
+
+
+async def iter_ndjson(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """
+    One JSON object per order, with its items nested. An order's rows may
+    straddle two batches, so the last order of a batch is held back until
+    the next one starts.
+    """
+    current: Optional[Dict[str, Any]] = None
+    async for rows in partitions:
+        lines: List[str] = []
+        for row in rows:
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    lines.append(json.dumps(current))
+                current = _order(row)
+            if row.item_id is not None:
+                current["items"].append({
+                    "id": row.item_id,
+                    "product_id": row.product_id,
+                    "quantity": row.quantity,
+                    "unit_price": row.unit_price,
+                })
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+    if current is not None:
+        yield (json.dumps(current) + "\n").encode()
+
+
+async def iter_csv(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """
+    One CSV row per order item, the order's columns repeated on each.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ORDER_FIELDS + ITEM_FIELDS)
+    async for rows in partitions:
+        for row in rows:
+            writer.writerow([_value(value) for value in row])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_orders(
+        partitions: AsyncIterator[Sequence[Row]], export_format: OrderExportFormat
+) -> AsyncIterator[bytes]:
+    """
+    Encode batches from `crud_order.stream_export` as a stream of body chunks.
+    """
+    if export_format == OrderExportFormat.CSV:
+        return iter_csv(partitions)
+    return iter_ndjson(partitions)
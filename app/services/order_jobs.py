@@ -0,0 +1,46 @@
+import logging
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import crud_order
+from app.models.order import Order
+from app.services.job_queue import enqueue, job_handler
+
+logger = logging.getLogger(__name__)
+
+ORDER_CONFIRMATION = "order_confirmation"
+KITCHEN_NOTIFICATION = "kitchen_notification"
+
+
+def enqueue_order_placed(db: AsyncSession, order: Order) -> None:
+    """
+    Queue the follow-up work of a new order, in the order's transaction.
+    """
+    for kind in (ORDER_CONFIRMATION, KITCHEN_NOTIFICATION):
+        enqueue(db, kind, {"order_id": order.id})
+
+
+@job_handler(ORDER_CONFIRMATION)
+async def send_order_confirmation(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    order = await crud_order.get(db, id=payload["order_id"])
+    if order is None:
+        return
+    logger.info(
+        "Order %s confirmation for user %s: total %.2f",
+        order.id, order.user_id, order.total_amount,
+    )
+
+
+@job_handler(KITCHEN_NOTIFICATION)
+async def notify_kitchen(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    order = await crud_order.get(
+        db, id=payload["order_id"], options=crud_order.items_options
+    )
+    if order is None:
+        return
+    logger.info(
+        "Order %s for the kitchen: %s",
+        order.id,
+        ", ".join(f"{item.quantity} x {item.product_id}" for item in order.items),
+    )
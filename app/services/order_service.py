@@ -1,77 +1,123 @@
 from typing import Dict, Any
+from uuid import uuid4
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud import crud_order, crud_product
+from app.crud.product import InsufficientStockError
 from app.models.order import Order, OrderStatus
 from app.schemas.order import OrderCreate, OrderUpdate
+from app.services.order_events import publish_status_change
+from app.services.order_jobs import enqueue_order_placed
 
 
 class OrderService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_order(self, order_in: OrderCreate, user_id: int) -> Order:
-        total_price = 0
-        order_items = []
-
+    async def create_order(self, order_in: OrderCreate, user_id: str) -> Order:
+        quantities: Dict[str, int] = {}
         for item in order_in.items:
-            product = crud_product.get(self.db, id=item.product_id)
-            if not product:
-                raise ValueError(f"Product with ID {item.product_id} not found")
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+        products = {
+            product.id: product
+            for product in await crud_product.get_many(self.db, ids=list(quantities))
+        }
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            raise ValueError(f"Products not found: {', '.join(missing)}")
+        unavailable = [
+            product_id for product_id, product in products.items()
+            if not product.is_available
+        ]
+        if unavailable:
+            raise ValueError(f"Products not available: {', '.join(unavailable)}")
 
-            item_price = product.price * item.quantity
+        total_price = 0
+        order_items = []
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            item_price = product.price * quantity
             total_price += item_price
 
             order_items.append({
-                "product_id": item.product_id,
-                "quantity": item.quantity,
+                "product_id": product_id,
+                "quantity": quantity,
                 "price": product.price,
                 "total": item_price
             })
 
-        order_data = OrderCreate(
-            address_id=order_in.address_id,
-            status=OrderStatus.PENDING,
-            total_amount=total_price
-        )
+        order_data = {
+            "id": str(uuid4()),
+            "address_id": order_in.address_id,
+            "payment_method": order_in.payment_method,
+            "status": OrderStatus.PENDING,
+            "total_amount": total_price,
+        }
 
-        order = crud_order.create_with_items(
+        # Lock order: product rows, then (through the order triggers) the
+        # sales rollup rows, as in cancel_order. A buyer queueing for a
+        # product holds no rollup rows other orders need.
+        try:
+            await crud_product.reserve_stock(self.db, quantities=quantities)
+        except InsufficientStockError:
+            await self.db.rollback()
+            raise
+        order = await crud_order.create_with_items(
             db=self.db,
             obj_in=order_data,
             user_id=user_id,
             items=order_items
         )
+        # Notifications run in the job workers once the order commits
+        enqueue_order_placed(self.db, order)
+        await self.db.commit()
 
-        return order
+        return await crud_order.get(
+            self.db, id=order.id, options=crud_order.items_options
+        )
 
-    def cancel_order(self, order_id: int) -> Order:
-        order = crud_order.get(self.db, id=order_id)
+    async def cancel_order(self, order_id: str) -> Order:
+        # Lock the order so concurrent cancels can't both return its stock
+        order = await self.db.get(
+            Order,
+            order_id,
+            options=crud_order.items_options,
+            with_for_update=True,
+            populate_existing=True,
+        )
         if not order:
             raise ValueError(f"Order with ID {order_id} not found")
 
-        if order.status in OrderStatus.DELIVERED:
+        if order.status in (OrderStatus.DELIVERED, OrderStatus.CANCELLED):
             raise ValueError(f"Cannot cancel order in {order.status} state")
 
+        quantities = await crud_order.get_item_quantities(self.db, order_id=order_id)
+        # Products before the status update's rollup rows, as in create_order
+        if quantities:
+            await crud_product.release_stock(self.db, quantities=quantities)
+        await publish_status_change(self.db, order, OrderStatus.CANCELLED)
         order_update = OrderUpdate(status=OrderStatus.CANCELLED)
-        updated_order = crud_order.update(self.db, db_obj=order, obj_in=order_update)
+        updated_order = await crud_order.update(self.db, db_obj=order, obj_in=order_update)
 
         return updated_order
 
-    def get_order_details(self, order_id: int) -> Dict[str, Any]:
-        order = crud_order.get(self.db, id=order_id)
+    async def get_order_details(self, order_id: str) -> Dict[str, Any]:
+        order = await crud_order.get(
+            self.db, id=order_id, options=crud_order.detail_options
+        )
         if not order:
             raise ValueError(f"Order with ID {order_id} not found")
 
         items_with_details = []
         for item in order.items:
-            product = crud_product.get(self.db, id=item.product_id)
             items_with_details.append({
                 "product_id": item.product_id,
-                "product_name": product.name,
+                "product_name": item.product.name,
                 "quantity": item.quantity,
-                "unit_price": item.price,
-                "total_price": item.total
+                "unit_price": item.unit_price,
+                "total_price": item.unit_price * item.quantity
             })
 
         return {
@@ -80,23 +126,37 @@ class OrderService:
             "status": order.status,
             "created_at": order.created_at,
             "updated_at": order.updated_at,
-            "total_price": order.total_price,
+            "total_price": order.total_amount,
             "items": items_with_details,
             "address": order.address
         }
 
-    def update_order_status(self, order_id: int, status: OrderStatus) -> Order:
-        order = crud_order.get(self.db, id=order_id)
+    async def update_order_status(self, order_id: str, status: OrderStatus) -> Order:
+        """
+        Move an order to `status`. Cancelled and delivered orders are final,
+        and cancelling goes through `cancel_order`, returning the stock.
+        """
+        if status == OrderStatus.CANCELLED:
+            return await self.cancel_order(order_id=order_id)
+
+        order = await self.db.get(
+            Order,
+            order_id,
+            options=crud_order.items_options,
+            with_for_update=True,
+            populate_existing=True,
+        )
         if not order:
             raise ValueError(f"Order with ID {order_id} not found")
 
-        if order.status == OrderStatus.CANCELLED and status != OrderStatus.CANCELLED:
+        if order.status == OrderStatus.CANCELLED:
             raise ValueError("Cannot change status of a cancelled order")
 
         if order.status == OrderStatus.DELIVERED and status != OrderStatus.DELIVERED:
             raise ValueError("Cannot change status of a delivered order")
 
+        await publish_status_change(self.db, order, status)
         order_update = OrderUpdate(status=status)
-        updated_order = crud_order.update(self.db, db_obj=order, obj_in=order_update)
+        updated_order = await crud_order.update(self.db, db_obj=order, obj_in=order_update)
 
         return updated_order
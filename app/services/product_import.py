@@ -0,0 +1,180 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import asyncpg
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import crud_product
+from app.schemas.product import (
+    ProductImportError, ProductImportKey, ProductImportResult, ProductImportRow
+)
+
+CSV_MEDIA_TYPES = {"text/csv", "application/csv"}
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+# What a batch the database won't take raises. The COPY goes to the driver
+# directly, so its errors aren't wrapped in DBAPIError, and values the driver
+# can't encode fail before any SQL runs.
+_REJECTED = (DBAPIError, asyncpg.PostgresError, OverflowError)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 bytes into lines without buffering the whole body.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_records(
+        chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row number, parsed value) for each non-blank NDJSON line.
+
+    Lines that are not valid JSON are yielded as the exception instance.
+    """
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, e
+
+
+async def iter_csv_records(
+        chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (row number, record) for each CSV data row, keyed by the header row.
+
+    Quoted fields may span lines: a record is complete once its quotes are
+    balanced. Empty cells are treated as missing values.
+    """
+    header = None
+    row = 0
+    buffered: List[str] = []
+    async for line in iter_lines(chunks):
+        buffered.append(line)
+        record = "\n".join(buffered)
+        if record.count('"') % 2:
+            continue
+        buffered = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        yield row, {
+            name: value for name, value in zip(header, values) if value != ""
+        }
+
+
+class ProductImportService:
+    def __init__(self, db: AsyncSession, key: ProductImportKey = ProductImportKey.SKU):
+        self.db = db
+        self.key = key
+        self.batch_size = settings.PRODUCT_IMPORT_BATCH_SIZE
+        self.result = ProductImportResult()
+
+    async def import_stream(
+            self, chunks: AsyncIterator[bytes], media_type: str
+    ) -> ProductImportResult:
+        """
+        Upsert every product of a CSV or NDJSON feed, batch by batch.
+
+        Each batch is committed on its own, so a bad row only costs its batch
+        a retry, not the whole feed. Invalid rows are skipped and reported.
+        """
+        if media_type in CSV_MEDIA_TYPES:
+            records = iter_csv_records(chunks)
+        elif media_type in NDJSON_MEDIA_TYPES:
+            records = iter_ndjson_records(chunks)
+        else:
+            raise ValueError(f"Unsupported media type {media_type!r}")
+
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        async for row, record in records:
+            data = self._validate(row, record)
+            if data is None:
+                continue
+            batch.append((row, data))
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+        return self.result
+
+    def _validate(self, row: int, record: Any) -> Optional[Dict[str, Any]]:
+        if isinstance(record, Exception):
+            self._fail(row, f"Invalid JSON: {record}")
+            return None
+        if not isinstance(record, dict):
+            self._fail(row, "Expected a JSON object")
+            return None
+        try:
+            data = ProductImportRow(**record).model_dump()
+        except ValidationError as e:
+            self._fail(row, "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            ))
+            return None
+        if not data[self.key.value]:
+            self._fail(row, f"Missing {self.key.value}")
+            return None
+        return data
+
+    async def _flush(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        try:
+            created, updated = await crud_product.upsert_many(
+                self.db, rows=[data for _, data in batch], key=self.key
+            )
+            await self.db.commit()
+        except _REJECTED:
+            await self.db.rollback()
+            await self._flush_rows(batch)
+            return
+        self.result.created += created
+        self.result.updated += updated
+
+    async def _flush_rows(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """
+        Retry a rejected batch row by row to find the rows the database refuses.
+        """
+        for row, data in batch:
+            try:
+                async with self.db.begin_nested():
+                    created, updated = await crud_product.upsert_many(
+                        self.db, rows=[data], key=self.key
+                    )
+            except _REJECTED as e:
+                error = e.orig if isinstance(e, DBAPIError) else e
+                self._fail(row, str(error).strip().splitlines()[0])
+                continue
+            self.result.created += created
+            self.result.updated += updated
+        await self.db.commit()
+
+    def _fail(self, row: int, error: str) -> None:
+        self.result.failed += 1
+        if len(self.result.errors) < settings.PRODUCT_IMPORT_MAX_ERRORS:
+            self.result.errors.append(ProductImportError(row=row, error=error))
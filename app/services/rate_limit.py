@@ -0,0 +1,121 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, literal
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.rate_limit import RateLimitBucket
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_POLICY = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+
+class RateLimit:
+    """
+    A token bucket: `burst` requests at once, refilled at `rate` per second.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+
+    @classmethod
+    def parse(cls, policy: str) -> Optional["RateLimit"]:
+        """
+        Parse "<count>/<period>" (e.g. "10/minute", "100/5 minutes"); the count
+        is also the burst. An empty policy means no limit.
+        """
+        if not policy:
+            return None
+        match = _POLICY.match(policy)
+        if not match or not int(match.group(1)):
+            raise ValueError(f"Invalid rate limit policy {policy!r}")
+        count, periods, unit = match.groups()
+        seconds = int(periods or 1) * _PERIODS[unit]
+        return cls(rate=int(count) / seconds, burst=int(count))
+
+
+class MemoryRateLimitBackend:
+    """
+    Buckets in this process only; limits apply per worker.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(limit.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / limit.rate
+
+
+class DatabaseRateLimitBackend:
+    """
+    Buckets in Postgres, shared by every worker: one atomic upsert per take.
+    """
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        bucket = RateLimitBucket.__table__
+        now = func.now()
+        stmt = insert(bucket).values(
+            key=key, tokens=limit.burst - 1, updated_at=now, allowed=True
+        )
+        refilled = func.least(
+            literal(float(limit.burst)),
+            bucket.c.tokens
+            + func.extract("epoch", now - bucket.c.updated_at) * literal(limit.rate),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[bucket.c.key],
+            set_={
+                "tokens": case((refilled >= 1, refilled - 1), else_=refilled),
+                "updated_at": now,
+                "allowed": refilled >= 1,
+            },
+        ).returning(bucket.c.tokens, bucket.c.allowed)
+        async with AsyncSessionLocal() as db:
+            tokens, allowed = (await db.execute(stmt)).one()
+            await db.commit()
+        if allowed:
+            return 0.0
+        return (1 - tokens) / limit.rate
+
+
+class RateLimiter:
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._limits: Dict[str, Optional[RateLimit]] = {}
+
+    async def check(self, name: str, policy: str, client: str) -> float:
+        """
+        Take a token from `client`'s bucket for `name`. Returns 0 if the
+        request may proceed, otherwise the seconds until it may be retried.
+        """
+        if policy not in self._limits:
+            self._limits[policy] = RateLimit.parse(policy)
+        limit = self._limits[policy]
+        if limit is None:
+            return 0.0
+        return await self.backend.take(f"{name}:{client}", limit)
+
+
+rate_limiter = RateLimiter(
+    DatabaseRateLimitBackend() if settings.RATE_LIMIT_BACKEND == "database"
+    else MemoryRateLimitBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+)
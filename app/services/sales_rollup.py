@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.crud import crud_order
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock held by whichever worker is reconciling
+_RECONCILE_LOCK = 0x5A1E5
+
+
+class SalesRollupReconciler:
+    """
+    Background task re-deriving the recent days of the sales rollups from
+    the order tables.
+
+    The triggers keep the rollups exact on their own; this bounds the damage
+    of anything that bypasses them (manual fixes, restores, bugs). Every
+    worker runs the loop but only one reconciles at a time.
+    """
+
+    def __init__(self, interval: float, days: int):
+        self.interval = interval
+        self.days = days
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reconcile(self) -> bool:
+        """
+        Rebuild the rollups from `days` days ago on, unless another worker
+        is doing so. Returns whether this call did.
+        """
+        since = datetime.now(timezone.utc).date() - timedelta(days=self.days)
+        async with AsyncSessionLocal() as db:
+            acquired = await db.scalar(
+                select(func.pg_try_advisory_xact_lock(_RECONCILE_LOCK))
+            )
+            if not acquired:
+                return False
+            await crud_order.rebuild_sales_rollups(db, since=since)
+            await db.commit()
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Failed to reconcile the sales rollups")
+
+
+sales_reconciler = SalesRollupReconciler(
+    interval=settings.SALES_RECONCILE_INTERVAL_SECONDS,
+    days=settings.SALES_RECONCILE_DAYS,
+)
@@ -0,0 +1,45 @@
+"""
+Background job worker; run as many as needed alongside the API:
+
+    python -m app.worker
+
+Stops claiming jobs on SIGINT or SIGTERM and exits once the running ones
+finish.
+"""
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.db.listener import ChangeListener
+from app.db.session import engine
+from app.services import order_jobs  # noqa: F401 (registers the job handlers)
+from app.services.job_queue import JobWorker
+
+
+async def main() -> None:
+    worker = JobWorker(
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        lease=settings.JOB_LEASE_SECONDS,
+        retry_base=settings.JOB_RETRY_BASE_SECONDS,
+        retry_max=settings.JOB_RETRY_MAX_SECONDS,
+    )
+    listener = ChangeListener(str(settings.DATABASE_URL))
+    listener.listen(settings.JOB_QUEUE_CHANNEL, worker.wake, on_reconnect=worker.wake)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    await listener.start()
+    try:
+        await worker.run()
+    finally:
+        await listener.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Memory footprint and latency of the product autocomplete index.
+
+Builds the index from synthetic products (no database needed), reports the
+memory it holds, then times suggestions and incremental updates:
+
+    python -m benchmarks.autocomplete_memory [products]
+"""
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from uuid import uuid4
+
+from app.services.autocomplete import AutocompleteIndex, ProductRow
+
+ADJECTIVES = [
+    "fresh", "organic", "spicy", "sweet", "smoked", "frozen", "crispy", "roasted",
+    "grilled", "classic", "mini", "large", "vegan", "golden", "wild", "homemade",
+]
+NOUNS = [
+    "pizza", "burger", "salad", "noodles", "dumplings", "sushi", "pasta", "soup",
+    "sandwich", "wrap", "curry", "tacos", "pancakes", "juice", "coffee", "cake",
+    "chicken", "salmon", "tofu", "cheese", "bread", "cookies", "lemonade", "tea",
+]
+CATEGORIES = [
+    "Pizza", "Burgers", "Salads", "Asian", "Italian", "Soups", "Drinks",
+    "Desserts", "Bakery", "Breakfast", "Grill", "Vegan",
+]
+
+
+def make_rows(count: int, rng: random.Random) -> list:
+    rows = []
+    for i in range(count):
+        words = rng.sample(ADJECTIVES, 2) + rng.sample(NOUNS, 2)
+        # A model number keeps the vocabulary growing like a real catalog
+        name = f"{' '.join(words).title()} {rng.choice('ABCDEFGHJK')}{i % 50000}"
+        rows.append(ProductRow(
+            str(uuid4()), name, rng.choice(CATEGORIES), rng.random() > 0.1
+        ))
+    return rows
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return sorted(samples)[int(len(samples) * fraction) - 1] * 1000
+
+
+def main(count: int) -> None:
+    rng = random.Random(42)
+    rows = make_rows(count, rng)
+    index = AutocompleteIndex()
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    index.load(rows)
+    build_time = time.perf_counter() - start
+    gc.collect()
+    # The names and ids are shared with `rows`, so count them separately
+    index_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    shared_bytes = sum(
+        sys.getsizeof(row.id) + sys.getsizeof(row.name) for row in rows
+    )
+    del rows
+
+    total = index_bytes + shared_bytes
+    print(f"products={count} terms={len(index.terms)} build={build_time:.2f}s (traced)")
+    print(f"index structures: {index_bytes / 2**20:.1f} MiB, "
+          f"ids and names: {shared_bytes / 2**20:.1f} MiB")
+    print(f"total: {total / 2**20:.1f} MiB "
+          f"({total / count:.0f} bytes/product, "
+          f"{total / count * 1_000_000 / 2**20:.0f} MiB per 1M products)")
+
+    queries = [
+        word[:length]
+        for word in ADJECTIVES + NOUNS + [c.lower() for c in CATEGORIES]
+        for length in (1, 2, 3, len(word))
+    ] + [f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)[:3]}" for _ in range(200)]
+    latencies = [timed(index.suggest, query, 10) for query in queries]
+    print(f"suggest: {len(queries)} queries p50={percentile(latencies, 0.5):.2f}ms "
+          f"p99={percentile(latencies, 0.99):.2f}ms max={max(latencies) * 1000:.2f}ms")
+
+    updates = make_rows(1000, rng)
+    latencies = [timed(index.upsert, row) for row in updates]
+    latencies += [timed(index.remove, row.id) for row in updates]
+    print(f"upsert/remove: p50={percentile(latencies, 0.5):.3f}ms "
+          f"p99={percentile(latencies, 0.99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
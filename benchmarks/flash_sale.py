@@ -0,0 +1,127 @@
+"""
+Flash-sale load test: many concurrent buyers of a single SKU.
+
+Checks that stock reservation never oversells, that orders for other
+products are not held up meanwhile, and that buyers cancelling right after
+buying (every CANCEL_EVERY-th successful one) never deadlock with the
+rest. Runs against TEST_DATABASE_URL, whose tables are dropped and
+recreated:
+
+    python -m benchmarks.flash_sale [buyers] [stock]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.crud.product import InsufficientStockError
+from app.db.base import Base
+from app.models.address import Address
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.order import OrderCreate, OrderItemCreate
+from app.services.order_service import OrderService
+
+CANCEL_EVERY = 5
+deadlocks = 0
+
+
+async def place_order(engine, product_id: str, cancel: bool = False) -> tuple[bool, float]:
+    global deadlocks
+    order_in = OrderCreate(
+        address_id="sale-address",
+        items=[OrderItemCreate(product_id=product_id, quantity=1)],
+    )
+    start = time.perf_counter()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        try:
+            order = await OrderService(session).create_order(order_in, user_id="sale-user")
+            placed = True
+            if cancel:
+                await OrderService(session).cancel_order(order.id)
+                await session.commit()
+        except InsufficientStockError:
+            placed = False
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) != "40P01":
+                raise
+            deadlocks += 1
+            placed = False
+    return placed, time.perf_counter() - start
+
+
+async def main(buyers: int, stock: int) -> None:
+    engine = create_async_engine(
+        str(settings.TEST_DATABASE_URL).replace("postgresql", "postgresql+asyncpg"),
+        pool_size=50,
+        max_overflow=0,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(
+            id="sale-user", email="sale@example.com", hashed_password="-"
+        ))
+        await conn.execute(insert(Address).values(
+            id="sale-address", user_id="sale-user", street="-", city="-",
+            state="-", postal_code="-",
+        ))
+        await conn.execute(insert(Product), [
+            {"id": "hot", "name": "Hot item", "price": 1.0, "stock_quantity": stock},
+            {"id": "other", "name": "Other item", "price": 1.0,
+             "stock_quantity": buyers},
+        ])
+
+    # Buyers of other products get their own pool, so their latency shows
+    # row-lock contention rather than queueing behind the sale for connections
+    other_engine = create_async_engine(engine.url, pool_size=5, max_overflow=0)
+    start = time.perf_counter()
+    sale = asyncio.gather(*[
+        place_order(engine, "hot", cancel=i % CANCEL_EVERY == 0) for i in range(buyers)
+    ])
+    other = asyncio.gather(*[
+        place_order(other_engine, "other", cancel=i % CANCEL_EVERY == 0) for i in range(20)
+    ])
+    sale_results, other_results = await asyncio.gather(sale, other)
+    elapsed = time.perf_counter() - start
+
+    async with AsyncSession(engine) as session:
+        remaining = await session.scalar(
+            select(Product.stock_quantity).where(Product.id == "hot")
+        )
+        orders = await session.scalar(
+            select(func.count(Order.id)).where(Order.user_id == "sale-user")
+        )
+        hot_cancelled = await session.scalar(
+            select(func.count(Order.id))
+            .join(OrderItem)
+            .where(OrderItem.product_id == "hot", Order.status == OrderStatus.CANCELLED)
+        )
+    await engine.dispose()
+    await other_engine.dispose()
+
+    placed = sum(1 for ok, _ in sale_results if ok)
+    sale_latency = sorted(latency for _, latency in sale_results)
+    other_latency = sorted(latency for _, latency in other_results)
+    print(f"buyers={buyers} stock={stock} elapsed={elapsed:.2f}s")
+    print(f"hot item: placed={placed} cancelled={hot_cancelled} "
+          f"rejected={buyers - placed} remaining={remaining}")
+    print(f"orders stored: {orders} (expected {placed + len(other_results)}), "
+          f"deadlocks={deadlocks}")
+    print(f"hot item p50={statistics.median(sale_latency) * 1000:.1f}ms "
+          f"p99={sale_latency[int(len(sale_latency) * 0.99) - 1] * 1000:.1f}ms")
+    print(f"other item p50={statistics.median(other_latency) * 1000:.1f}ms "
+          f"max={other_latency[-1] * 1000:.1f}ms")
+    assert deadlocks == 0, "deadlocked"
+    assert remaining == stock - placed + hot_cancelled, "oversold or undersold"
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [1000, 100][len(args):])))
@@ -0,0 +1,168 @@
+"""
+CPU cost of serializing list responses, before and after the prebuilt adapters.
+
+Each list endpoint is mounted twice on a bare app, returning the same page of
+ORM objects (built in memory, no database needed): once the old way, as a
+`Page` model that FastAPI validates again and serializes, and once through
+the endpoint's `ResponseAdapter`. Requests are driven through the ASGI app
+directly and timed with process CPU time:
+
+    python -m benchmarks.list_serialization [page_size] [requests]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from fastapi import FastAPI
+
+from app.api.v1.endpoints.addresses import ADDRESS_PAGE
+from app.api.v1.endpoints.orders import ORDER_PAGE
+from app.api.v1.endpoints.users import USER_PAGE
+from app.models.address import Address as AddressModel
+from app.models.order import Order as OrderModel, OrderItem as OrderItemModel, OrderStatus
+from app.models.product import Product as ProductModel
+from app.models.user import User as UserModel
+from app.schemas.address import Address
+from app.schemas.common import Page
+from app.schemas.order import Order
+from app.schemas.product import Product
+from app.schemas.user import User, UserInDBBase
+from app.services.catalog_cache import _PRODUCT_PAGE
+
+NOW = datetime(2024, 1, 1, 12, 0)
+NEXT_CURSOR = "eyJrIjogWyIyMDI0LTAxLTAxIiwgIjk5Il19"
+
+
+def make_products(count: int) -> list:
+    return [
+        ProductModel(
+            id=f"product-{i}", name=f"Product {i}", description="Tasty " * 20,
+            price=9.99 + i, category="Pizza", is_available=True,
+            stock_quantity=100, created_at=NOW, updated_at=NOW,
+        )
+        for i in range(count)
+    ]
+
+
+def make_orders(count: int) -> list:
+    orders = []
+    for i in range(count):
+        order = OrderModel(
+            id=f"order-{i}", user_id="user-1", address_id="address-1", total_amount=42.5,
+            status=OrderStatus.PENDING, created_at=NOW, updated_at=NOW,
+        )
+        order.items = [
+            OrderItemModel(
+                id=f"{i}-{n}", product_id=f"product-{n}", quantity=2, unit_price=9.99
+            )
+            for n in range(3)
+        ]
+        orders.append(order)
+    return orders
+
+
+def make_users(count: int) -> list:
+    users = []
+    for i in range(count):
+        user = UserModel(
+            id=f"user-{i}", email=f"user{i}@example.com", phone="+70000000000",
+            is_active=True,
+        )
+        # Fields the response schema has but the table doesn't
+        user.created_at = NOW
+        users.append(user)
+    return users
+
+
+def make_addresses(count: int) -> list:
+    addresses = []
+    for i in range(count):
+        address = AddressModel(
+            id=f"address-{i}", user_id="user-1", street="Lenina 1", city="Moscow",
+            state="Moscow", postal_code="101000", country="Russia", is_default=False,
+        )
+        addresses.append(address)
+    return addresses
+
+
+def mount(app: FastAPI, name: str, schema, adapter, items: list, old_schema=None) -> None:
+    old_schema = old_schema or schema
+
+    async def before():
+        return Page[old_schema](items=items, next_cursor=NEXT_CURSOR)
+
+    async def after():
+        return adapter.response({"items": items, "next_cursor": NEXT_CURSOR})
+
+    app.get(f"/before/{name}", response_model=Page[old_schema])(before)
+    app.get(f"/after/{name}", response_model=Page[schema])(after)
+
+
+def build_app(page_size: int) -> FastAPI:
+    app = FastAPI()
+    mount(app, "products", Product, _PRODUCT_PAGE, make_products(page_size))
+    mount(app, "orders", Order, ORDER_PAGE, make_orders(page_size))
+    # The old response schema re-validated every stored email address
+    mount(app, "users", User, USER_PAGE, make_users(page_size), UserInDBBase)
+    mount(app, "addresses", Address, ADDRESS_PAGE, make_addresses(page_size))
+    return app
+
+
+async def request(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def cpu_per_request(app: FastAPI, path: str, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        await request(app, path)
+    return (time.process_time() - start) / requests
+
+
+async def compare(app: FastAPI, name: str, requests: int, rounds: int = 5) -> tuple:
+    """
+    Best of several interleaved rounds, so both variants see the same noise.
+    """
+    before, after = [], []
+    for _ in range(rounds):
+        before.append(await cpu_per_request(app, f"/before/{name}", requests))
+        after.append(await cpu_per_request(app, f"/after/{name}", requests))
+    return min(before), min(after)
+
+
+async def main(page_size: int, requests: int) -> None:
+    app = build_app(page_size)
+    print(f"page size={page_size}, {requests} requests per endpoint, CPU ms/request")
+    for name in ("products", "orders", "users", "addresses"):
+        old_body = await request(app, f"/before/{name}")
+        new_body = await request(app, f"/after/{name}")
+        assert old_body == new_body, name
+        before, after = await compare(app, name, requests)
+        print(f"{name:>10}: before={before * 1000:.3f} after={after * 1000:.3f} "
+              f"({before / after:.2f}x, {len(new_body)} bytes)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    asyncio.run(main(
+        int(args[0]) if args else 100, int(args[1]) if len(args) > 1 else 200
+    ))
@@ -0,0 +1,120 @@
+"""
+Login storm: catalog read latency while many clients log in at once.
+
+Catalog reads run in a steady loop while waves of concurrent logins verify
+bcrypt passwords, first with hashing inline (the old behaviour, which holds
+the event loop for every hash) and then with the bounded process pool.
+Runs against TEST_DATABASE_URL, whose tables are dropped and recreated:
+
+    python -m benchmarks.login_storm [concurrent_logins] [seconds]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.http_cache import Representation
+from app.core.security import HashingQueueFull, PasswordHasher, get_password_hash
+from app.crud import crud_product, crud_user
+from app.db.base import Base
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.product import Product as ProductSchema
+
+PASSWORD = "correct horse battery staple"
+
+
+async def read_catalog(engine, stop: asyncio.Event) -> list:
+    latencies = []
+    async with AsyncSession(engine) as session:
+        while not stop.is_set():
+            start = time.perf_counter()
+            product = await crud_product.get(session, id="storm-product")
+            Representation.from_model(ProductSchema.model_validate(product))
+            latencies.append(time.perf_counter() - start)
+            session.expunge_all()
+            await asyncio.sleep(0.005)
+    return latencies
+
+
+async def login(engine, hasher: PasswordHasher) -> str:
+    async with AsyncSession(engine) as session:
+        user = await crud_user.get_by_email(session, email="storm@example.com")
+        try:
+            ok = await hasher.verify(PASSWORD, user.hashed_password)
+        except HashingQueueFull:
+            return "rejected"
+    return "ok" if ok else "failed"
+
+
+async def storm(engine, hasher: PasswordHasher, concurrency: int, stop: asyncio.Event) -> list:
+    outcomes = []
+    while not stop.is_set():
+        outcomes += await asyncio.gather(
+            *[login(engine, hasher) for _ in range(concurrency)]
+        )
+    return outcomes
+
+
+def report(label: str, latencies: list, outcomes: list) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(
+        f"{label:>14}: catalog reads={len(latencies)} "
+        f"p50={statistics.median(latencies) * 1000:.1f}ms "
+        f"p99={p99 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms | "
+        f"logins ok={outcomes.count('ok')} rejected={outcomes.count('rejected')}"
+    )
+
+
+async def run(engine, hasher: PasswordHasher, concurrency: int, seconds: float) -> tuple:
+    stop = asyncio.Event()
+    reader = asyncio.create_task(read_catalog(engine, stop))
+    logins = asyncio.create_task(storm(engine, hasher, concurrency, stop)) if concurrency else None
+    await asyncio.sleep(seconds)
+    stop.set()
+    return await reader, (await logins if logins else [])
+
+
+async def main(concurrency: int, seconds: float) -> None:
+    engine = create_async_engine(
+        str(settings.TEST_DATABASE_URL).replace("postgresql", "postgresql+asyncpg"),
+        pool_size=concurrency + 5,
+        max_overflow=0,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(
+            id="storm-user", email="storm@example.com",
+            hashed_password=get_password_hash(PASSWORD),
+        ))
+        await conn.execute(insert(Product).values(
+            id="storm-product", name="Storm item", description="x" * 500, price=1.0,
+        ))
+
+    print(f"{concurrency} concurrent logins for {seconds:.0f}s per run, "
+          f"pool workers={settings.PASSWORD_HASH_WORKERS} "
+          f"max pending={settings.PASSWORD_HASH_MAX_PENDING}")
+    inline = PasswordHasher(workers=0, max_pending=concurrency)
+    report("no logins", *await run(engine, inline, 0, seconds))
+    report("inline bcrypt", *await run(engine, inline, concurrency, seconds))
+    pool = PasswordHasher(
+        workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    )
+    await pool.verify(PASSWORD, get_password_hash(PASSWORD))  # start the workers
+    report("process pool", *await run(engine, pool, concurrency, seconds))
+    pool.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    asyncio.run(main(
+        int(args[0]) if args else 100, float(args[1]) if len(args) > 1 else 5.0
+    ))
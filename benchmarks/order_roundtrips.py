@@ -0,0 +1,74 @@
+"""
+Count the SQL statements OrderService.create_order sends per order.
+
+Runs against TEST_DATABASE_URL, whose tables are dropped and recreated:
+
+    python -m benchmarks.order_roundtrips
+"""
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.address import Address
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.order import OrderCreate, OrderItemCreate
+from app.services.order_service import OrderService
+
+LINE_COUNTS = (1, 10, 50)
+
+
+async def main() -> None:
+    engine = create_async_engine(
+        str(settings.TEST_DATABASE_URL).replace("postgresql", "postgresql+asyncpg")
+    )
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    product_ids = [str(uuid4()) for _ in range(max(LINE_COUNTS))]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(
+            id="bench-user", email="bench@example.com", hashed_password="-"
+        ))
+        await conn.execute(insert(Address).values(
+            id="bench-address", user_id="bench-user", street="-", city="-",
+            state="-", postal_code="-",
+        ))
+        await conn.execute(insert(Product), [
+            {"id": product_id, "name": f"Product {i}", "price": 10.0 + i,
+             "stock_quantity": 1_000_000}
+            for i, product_id in enumerate(product_ids)
+        ])
+
+    print(f"{'lines':>5} {'statements':>10} {'ms':>8}")
+    for lines in LINE_COUNTS:
+        order_in = OrderCreate(
+            address_id="bench-address",
+            items=[
+                OrderItemCreate(product_id=product_id, quantity=2)
+                for product_id in product_ids[:lines]
+            ],
+        )
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            statements.clear()
+            start = time.perf_counter()
+            await OrderService(session).create_order(order_in, user_id="bench-user")
+            elapsed = (time.perf_counter() - start) * 1000
+        print(f"{lines:>5} {len(statements):>10} {elapsed:>8.1f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
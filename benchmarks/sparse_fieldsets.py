@@ -0,0 +1,121 @@
+"""
+Sparse fieldsets: response size and build time of a 100-record page, in
+full and with `fields=...`, for products and orders.
+
+Pages are built the way the endpoints build them (CRUD query with the
+fieldset's loader options, then the page serializer), without HTTP or
+the catalog cache. Runs against TEST_DATABASE_URL, whose tables are
+dropped and recreated:
+
+    python -m benchmarks.sparse_fieldsets [rounds]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.serialization import ResponseAdapter
+from app.crud import crud_order, crud_product
+from app.db.base import Base
+from app.models.address import Address
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.common import Page
+from app.schemas.fieldsets import parse_fieldset
+from app.schemas.order import Order as OrderSchema
+from app.schemas.product import Product as ProductSchema
+
+PAGE_SIZE = 100
+ITEMS_PER_ORDER = 3
+PRODUCT_FIELDS = "name,price,is_available"
+ORDER_FIELDS = "status,total_amount,created_at"
+DESCRIPTION = (
+    "Тонкое тесто, томатный соус, моцарелла, пепперони и орегано. "
+    "Выпекается в дровяной печи, подаётся горячей, 30 см."
+)
+
+
+async def seed(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(
+            id="user", email="user@example.com", hashed_password="-"
+        ))
+        await conn.execute(insert(Address).values(
+            id="address", user_id="user", street="-", city="-", state="-",
+            postal_code="-",
+        ))
+        await conn.execute(insert(Product), [
+            {
+                "id": f"product-{i:03}",
+                "name": f"Пицца пепперони №{i}",
+                "sku": f"PZ-{i:05}",
+                "description": DESCRIPTION,
+                "price": 590.0 + i,
+                "image_url": f"https://cdn.example.com/products/{i:03}.jpg",
+                "category": "pizza",
+                "stock_quantity": 100,
+            }
+            for i in range(PAGE_SIZE)
+        ])
+        await conn.execute(insert(Order), [
+            {"id": f"order-{i:03}", "user_id": "user", "address_id": "address",
+             "total_amount": 1770.0, "payment_method": "card"}
+            for i in range(PAGE_SIZE)
+        ])
+        await conn.execute(insert(OrderItem), [
+            {"id": f"item-{i:03}-{j}", "order_id": f"order-{i:03}",
+             "product_id": f"product-{(i + j) % PAGE_SIZE:03}", "quantity": 1,
+             "unit_price": 590.0}
+            for i in range(PAGE_SIZE) for j in range(ITEMS_PER_ORDER)
+        ])
+
+
+async def measure(engine, crud, options, adapter, rounds: int) -> tuple[int, float]:
+    """
+    Body size of the first page, and the median time to build it.
+    """
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        async with AsyncSession(engine) as session:
+            records, next_cursor = await crud.get_multi(
+                session, limit=PAGE_SIZE, options=options
+            )
+            body = adapter.dump_json({"items": records, "next_cursor": next_cursor})
+        timings.append(time.perf_counter() - start)
+    return len(body), statistics.median(timings)
+
+
+async def main(rounds: int) -> None:
+    engine = create_async_engine(
+        str(settings.TEST_DATABASE_URL).replace("postgresql", "postgresql+asyncpg")
+    )
+    await seed(engine)
+
+    product_fields = parse_fieldset(ProductSchema, PRODUCT_FIELDS)
+    order_fields = parse_fieldset(OrderSchema, ORDER_FIELDS)
+    cases = [
+        ("products", "full", crud_product, (), ResponseAdapter(Page[ProductSchema])),
+        ("products", f"fields={PRODUCT_FIELDS}", crud_product,
+         crud_product.fields_options(product_fields.fields), product_fields.page),
+        ("orders", "full", crud_order, crud_order.items_options,
+         ResponseAdapter(Page[OrderSchema])),
+        ("orders", f"fields={ORDER_FIELDS}", crud_order,
+         crud_order.fields_options(order_fields.fields), order_fields.page),
+    ]
+    print(f"{PAGE_SIZE} records per page, median of {rounds} rounds")
+    for name, variant, crud, options, adapter in cases:
+        size, elapsed = await measure(engine, crud, options, adapter, rounds)
+        print(f"{name:8} {variant:40} {size:7} B {elapsed * 1000:6.1f} ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,94 @@
+import asyncio
+import os
+from uuid import uuid4
+
+import pytest
+
+os.environ.setdefault("APP_NAME", "DeliveryAPI")
+os.environ.setdefault("TEST_DATABASE_URL", "postgresql://postgres@localhost/test")
+# Never run the tests against the real database
+os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+os.environ.pop("REPLICA_DATABASE_URL", None)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.address import Address  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+async def _reset_schema() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Pooled connections belong to the event loop that opened them
+    await engine.dispose()
+
+
+async def _add(*objects: Base) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add_all(objects)
+        await db.commit()
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def database() -> None:
+    asyncio.run(_reset_schema())
+
+
+@pytest.fixture
+def add(database):
+    """
+    Insert rows, before the test's client makes any requests.
+    """
+    return lambda *objects: asyncio.run(_add(*objects))
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    # Skip the change listener, autocomplete index and background tasks
+    monkeypatch.setattr(app.router, "on_startup", [])
+    monkeypatch.setattr(app.router, "on_shutdown", [])
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(engine.dispose)
+
+
+def make_user(**kwargs) -> User:
+    user_id = str(uuid4())
+    kwargs.setdefault("is_active", True)
+    kwargs.setdefault("is_superuser", False)
+    return User(
+        id=user_id,
+        email=f"{user_id}@example.com",
+        hashed_password="x",
+        full_name="Test User",
+        **kwargs,
+    )
+
+
+def make_address(user: User, **kwargs) -> Address:
+    return Address(
+        id=str(uuid4()),
+        user_id=user.id,
+        street="Тверская 1",
+        city="Москва",
+        state="Москва",
+        postal_code="125009",
+        **kwargs,
+    )
+
+
+def make_product(**kwargs) -> Product:
+    kwargs.setdefault("is_available", True)
+    kwargs.setdefault("stock_quantity", 10)
+    return Product(id=str(uuid4()), name="Пицца", price=500.0, category="pizza", **kwargs)
+
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
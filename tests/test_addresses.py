@@ -0,0 +1,71 @@
+from uuid import uuid4
+
+from tests.conftest import auth_headers, make_address, make_user
+
+
+def test_address_of_another_user(client, add):
+    owner, other = make_user(), make_user()
+    address = make_address(owner)
+    add(owner, other, address)
+
+    url = f"/api/v1/addresses/{address.id}"
+    headers = auth_headers(other)
+    assert client.get(url, headers=headers).status_code == 400
+    assert client.put(url, json={"city": "Казань"}, headers=headers).status_code == 400
+    assert client.delete(url, headers=headers).status_code == 400
+
+
+def test_address_not_found(client, add):
+    user = make_user()
+    add(user)
+
+    url = f"/api/v1/addresses/{uuid4()}"
+    headers = auth_headers(user)
+    assert client.get(url, headers=headers).status_code == 404
+    assert client.put(url, json={"city": "Казань"}, headers=headers).status_code == 404
+    assert client.delete(url, headers=headers).status_code == 404
+
+
+def test_address_lifecycle(client, add):
+    user = make_user()
+    add(user)
+    headers = auth_headers(user)
+
+    response = client.post("/api/v1/addresses/", json={
+        "street": "Тверская 1", "city": "Москва", "state": "Москва", "postal_code": "125009",
+    }, headers=headers)
+    assert response.status_code == 200
+    address = response.json()
+    assert address["user_id"] == user.id
+    url = f"/api/v1/addresses/{address['id']}"
+
+    assert client.get(url, headers=headers).json() == address
+    page = client.get("/api/v1/addresses/", headers=headers).json()
+    assert page["items"] == [address]
+    response = client.put(url, json={"postal_code": "125010"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["postal_code"] == "125010"
+    assert client.delete(url, headers=headers).status_code == 200
+    assert client.get(url, headers=headers).status_code == 404
+
+
+def test_read_addresses_batch(client, add):
+    user, other = make_user(), make_user()
+    first, second, foreign = make_address(user), make_address(user), make_address(other)
+    add(user, other, first, second, foreign)
+    headers = auth_headers(user)
+
+    response = client.get(
+        "/api/v1/addresses/batch",
+        params={"ids": [second.id, str(uuid4()), first.id]},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    addresses = response.json()
+    assert [address["id"] for address in addresses] == [second.id, first.id]
+    assert addresses[0]["postal_code"] == second.postal_code
+    response = client.get(
+        "/api/v1/addresses/batch", params={"ids": [first.id, foreign.id]}, headers=headers
+    )
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import asyncio
+
+from app.core.cache import TTLCache
+
+
+def test_get_or_load_coalesces_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("key", load) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == 1
+    assert cache.get("key") == "value"
+
+
+def test_get_or_load_survives_cancelled_loader():
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_load("key", load))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_load("key", load)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(main()) == ["value"] * 3
+    # Loaded again by one of the waiters only
+    assert calls == 2
+
+
+def test_get_or_load_cancelled_waiter():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_load("key", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("key", load))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        value = await leader
+        assert waiter.cancelled()
+        return value
+
+    assert asyncio.run(main()) == "value"
+
+
+def test_get_or_load_shares_errors():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_load("key", load) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(e, RuntimeError) for e in results)
+
+
+def test_set_with_shorter_ttl(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now)
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    cache.set("short", "value", ttl=5)
+    cache.set("long", "value", ttl=600)
+    cache.set("expired", "value", ttl=-1)
+    now += 10
+
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+    assert cache.get("expired") is None
+    now += 60
+    assert cache.get("long") is None
@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.api.idempotency import IdempotencyMiddleware
+from app.db.session import engine
+from tests.conftest import auth_headers, make_user
+
+ADDRESS = {"street": "Тверская 1", "city": "Москва", "state": "Москва", "postal_code": "125009"}
+
+
+def test_replays_authenticated_create(client, add):
+    user = make_user()
+    add(user)
+    headers = {**auth_headers(user), "Idempotency-Key": uuid4().hex}
+
+    first = client.post("/api/v1/addresses/", json=ADDRESS, headers=headers)
+    second = client.post("/api/v1/addresses/", json=ADDRESS, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    page = client.get("/api/v1/addresses/", headers=auth_headers(user)).json()
+    assert [address["id"] for address in page["items"]] == [first.json()["id"]]
+    other = client.post(
+        "/api/v1/addresses/", json={**ADDRESS, "city": "Казань"}, headers=headers
+    )
+    assert other.status_code == 422
+
+
+@pytest.fixture
+def anonymous_client(database):
+    """
+    A client of an echo endpoint behind the middleware, whose requests come
+    from the address in their X-Client header.
+    """
+    calls = []
+
+    async def echo(request: Request) -> JSONResponse:
+        calls.append(await request.json())
+        return JSONResponse({"call": len(calls)})
+
+    app = Starlette(routes=[Route("/echo", echo, methods=["POST"])])
+    app.add_middleware(IdempotencyMiddleware, paths=["/echo"])
+
+    async def from_client(scope, receive, send):
+        if scope["type"] == "http":
+            scope["client"] = (Headers(scope=scope)["x-client"], 50000)
+        await app(scope, receive, send)
+
+    with TestClient(from_client) as client:
+        yield client, calls
+        client.portal.call(engine.dispose)
+
+
+def test_anonymous_keys_are_not_shared(anonymous_client):
+    client, calls = anonymous_client
+    key = uuid4().hex
+
+    def post(host, email):
+        headers = {"Idempotency-Key": key, "X-Client": host}
+        return client.post("/echo", json={"email": email}, headers=headers)
+
+    first = post("10.0.0.1", "a@example.com")
+    other_body = post("10.0.0.2", "b@example.com")
+    other_client = post("10.0.0.2", "a@example.com")
+    retry = post("10.0.0.1", "a@example.com")
+
+    assert first.json() == {"call": 1}
+    assert other_body.json() == {"call": 2}
+    assert other_client.json() == {"call": 3}
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == {"call": 1}
+    assert len(calls) == 3
@@ -0,0 +1,8 @@
+from app.main import app
+
+
+def test_openapi_schema_builds():
+    schema = app.openapi()
+
+    events = schema["paths"]["/api/v1/orders/{order_id}/events"]["get"]
+    assert "text/event-stream" in events["responses"]["200"]["content"]
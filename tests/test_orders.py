@@ -0,0 +1,137 @@
+from uuid import uuid4
+
+from app.db.session import AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from tests.conftest import auth_headers, make_address, make_product, make_user
+
+
+def make_order(add, **kwargs):
+    user = make_user()
+    address = make_address(user)
+    order = Order(
+        id=str(uuid4()),
+        user_id=user.id,
+        address_id=address.id,
+        total_amount=100.0,
+        status=OrderStatus.PENDING,
+        **kwargs,
+    )
+    add(user, address, order)
+    return user, order
+
+
+def test_read_order(client, add):
+    user, order = make_order(add)
+
+    response = client.get(f"/api/v1/orders/{order.id}", headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json()["id"] == order.id
+
+
+def test_read_order_not_found(client, add):
+    user, _ = make_order(add)
+
+    response = client.get(f"/api/v1/orders/{uuid4()}", headers=auth_headers(user))
+
+    assert response.status_code == 404
+
+
+def test_read_order_of_another_user(client, add):
+    _, order = make_order(add)
+    other = make_user()
+    add(other)
+
+    response = client.get(f"/api/v1/orders/{order.id}", headers=auth_headers(other))
+
+    assert response.status_code == 400
+
+
+def test_update_order_status_as_owner(client, add):
+    user, order = make_order(add)
+
+    response = client.put(
+        f"/api/v1/orders/{order.id}",
+        json={"status": "confirmed"},
+        headers=auth_headers(user),
+    )
+
+    assert response.status_code == 400
+
+
+def test_update_order_status_as_admin(client, add):
+    _, order = make_order(add)
+    admin = make_user(is_superuser=True)
+    add(admin)
+
+    response = client.put(
+        f"/api/v1/orders/{order.id}",
+        json={"status": "confirmed"},
+        headers=auth_headers(admin),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed"
+
+
+def test_cancel_order(client, add):
+    user, order = make_order(add)
+
+    response = client.delete(f"/api/v1/orders/{order.id}", headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    response = client.get(f"/api/v1/orders/{order.id}", headers=auth_headers(user))
+    assert response.json()["status"] == "cancelled"
+
+
+def _stock(client, product_id):
+    async def stock():
+        async with AsyncSessionLocal() as db:
+            return (await db.get(Product, product_id)).stock_quantity
+
+    return client.portal.call(stock)
+
+
+def test_cancelled_order_stays_cancelled(client, add):
+    user, admin = make_user(), make_user(is_superuser=True)
+    address = make_address(user)
+    product = make_product(stock_quantity=5)
+    add(user, admin, address, product)
+    response = client.post(
+        "/api/v1/orders/",
+        json={"address_id": address.id, "items": [{"product_id": product.id, "quantity": 5}]},
+        headers=auth_headers(user),
+    )
+    assert response.status_code == 200
+    url = f"/api/v1/orders/{response.json()['id']}"
+    assert _stock(client, product.id) == 0
+
+    assert client.delete(url, headers=auth_headers(user)).status_code == 200
+    assert _stock(client, product.id) == 5
+    for headers in (auth_headers(user), auth_headers(admin)):
+        response = client.put(url, json={"status": "pending"}, headers=headers)
+        assert response.status_code == 400
+    assert client.delete(url, headers=auth_headers(user)).status_code == 400
+    assert client.get(url, headers=auth_headers(user)).json()["status"] == "cancelled"
+    assert _stock(client, product.id) == 5
+
+
+def test_cancel_order_by_status_returns_stock(client, add):
+    user, admin = make_user(), make_user(is_superuser=True)
+    address = make_address(user)
+    product = make_product(stock_quantity=5)
+    add(user, admin, address, product)
+    response = client.post(
+        "/api/v1/orders/",
+        json={"address_id": address.id, "items": [{"product_id": product.id, "quantity": 2}]},
+        headers=auth_headers(user),
+    )
+    url = f"/api/v1/orders/{response.json()['id']}"
+
+    response = client.put(url, json={"status": "cancelled"}, headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    assert _stock(client, product.id) == 5
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.crud import crud_product
+from app.models.product import Product
+from tests.conftest import auth_headers, make_product, make_user
+
+LIST_URLS = [
+    "/api/v1/products/",
+    "/api/v1/users/",
+    "/api/v1/orders/",
+    "/api/v1/addresses/",
+]
+
+
+@pytest.mark.parametrize("url", LIST_URLS)
+@pytest.mark.parametrize("limit", [0, -1, settings.PAGE_MAX_LIMIT + 1])
+def test_list_rejects_bad_limit(client, add, url, limit):
+    admin = make_user(is_superuser=True)
+    add(admin)
+
+    response = client.get(url, params={"limit": limit}, headers=auth_headers(admin))
+
+    assert response.status_code == 422
+
+
+def test_products_pages(client, add):
+    add(*(make_product() for _ in range(3)))
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/v1/products/", params=params).json()
+        ids += [product["id"] for product in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(ids) == len(set(ids)) >= 3
+
+
+def test_get_page_rejects_zero_limit():
+    with pytest.raises(ValueError):
+        asyncio.run(crud_product.get_page(None, select(Product), limit=0))
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.product import Product
+from app.schemas.product import ProductImportKey
+from app.services.product_import import ProductImportService
+
+
+async def _chunks(records):
+    for record in records:
+        yield (json.dumps(record) + "\n").encode()
+
+
+def run_import(records, key=ProductImportKey.SKU):
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await ProductImportService(db, key).import_stream(
+                    _chunks(records), "application/x-ndjson"
+                )
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def load_products(**filters):
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(Product).filter_by(**filters))
+                return result.scalars().all()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_import_rejects_out_of_range_numbers(database):
+    sku = uuid4().hex
+    result = run_import([
+        {"sku": f"{sku}-1", "name": "Ok", "price": 10},
+        {"sku": f"{sku}-2", "name": "Too many", "price": 10, "stock_quantity": 2 ** 31},
+        {"sku": f"{sku}-3", "name": "Negative", "price": -1},
+    ])
+
+    assert (result.created, result.updated, result.failed) == (1, 0, 2)
+    assert [error.row for error in result.errors] == [2, 3]
+
+
+def test_import_reports_the_rows_a_failed_batch_rejects(database):
+    name, sku = uuid4().hex, uuid4().hex
+    # The third row's SKU collides with the first two's, so the batch fails
+    # and is retried row by row; the first two rows share their key
+    result = run_import([
+        {"name": name, "sku": sku, "price": 1},
+        {"name": name, "sku": sku, "price": 2},
+        {"name": f"{name}-other", "sku": sku, "price": 3},
+    ], key=ProductImportKey.NAME)
+
+    assert (result.created, result.updated, result.failed) == (1, 1, 1)
+    assert [error.row for error in result.errors] == [3]
+    assert [product.price for product in load_products(sku=sku)] == [2]
+
+
+def test_import_flush_survives_driver_encode_errors(database):
+    sku = uuid4().hex
+
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                service = ProductImportService(db)
+                row = {
+                    "sku": sku, "name": "Overflow", "price": 1.0, "description": None,
+                    "image_url": None, "category": None, "is_available": True,
+                    "stock_quantity": 2 ** 40,
+                }
+                await service._flush([(1, row)])
+                return service.result
+        finally:
+            await engine.dispose()
+
+    result = asyncio.run(main())
+
+    assert (result.created, result.failed) == (0, 1)
+    assert load_products(sku=sku) == []
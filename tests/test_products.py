@@ -0,0 +1,82 @@
+from uuid import uuid4
+
+from tests.conftest import auth_headers, make_product, make_user
+
+
+def test_read_product(client, add):
+    product = make_product()
+    add(product)
+
+    response = client.get(f"/api/v1/products/{product.id}")
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Пицца"
+    etag = response.headers["etag"]
+    response = client.get(f"/api/v1/products/{product.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_read_product_not_found(client, database):
+    assert client.get(f"/api/v1/products/{uuid4()}").status_code == 404
+
+
+def test_read_product_after_update(client, add):
+    admin = make_user(is_superuser=True)
+    product = make_product()
+    add(admin, product)
+    url = f"/api/v1/products/{product.id}"
+    assert client.get(url).json()["price"] == 500.0
+    assert client.get(url, params={"fields": "price"}).json() == {
+        "id": product.id, "price": 500.0
+    }
+
+    response = client.put(url, json={"price": 450.0}, headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    assert client.get(url).json()["price"] == 450.0
+    assert client.get(url, params={"fields": "price"}).json()["price"] == 450.0
+
+
+def test_read_products_batch(client, add):
+    first, second = make_product(), make_product()
+    add(first, second)
+
+    response = client.get(
+        "/api/v1/products/batch", params={"ids": [second.id, str(uuid4()), first.id]}
+    )
+
+    assert response.status_code == 200
+    assert [product["id"] for product in response.json()] == [second.id, first.id]
+
+
+def test_search_products_pages(client, add):
+    products = [make_product() for _ in range(5)]
+    for i, product in enumerate(products):
+        product.name = f"Calzone {i}"
+    products[3].name = "Calzone calzone"
+    add(*products)
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "calzone", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/products/search", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen += [product["id"] for product in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # The name matching twice ranks first, the ties follow by ID
+    others = sorted(product.id for product in products if product is not products[3])
+    assert seen == [products[3].id, *others]
+
+
+def test_search_products_rejects_bad_cursor(client, database):
+    response = client.get("/api/v1/products/search", params={"q": "пицца", "cursor": "x"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,73 @@
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+from app.crud import crud_product
+from app.crud.product import InsufficientStockError
+from app.db import changes
+from app.db.session import AsyncSessionLocal, engine
+from app.models.product import Product
+from tests.conftest import make_product
+
+
+@pytest.fixture
+def product_changes(monkeypatch):
+    monkeypatch.setattr(changes, "_handlers", defaultdict(list))
+    changed = []
+    changes.on_change(Product.__tablename__, changed.append)
+    return changed
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def _reserve(quantities):
+    async with AsyncSessionLocal() as db:
+        await crud_product.reserve_stock(db, quantities=quantities)
+        await db.commit()
+
+
+async def _release(quantities):
+    async with AsyncSessionLocal() as db:
+        await crud_product.release_stock(db, quantities=quantities)
+        await db.commit()
+
+
+async def _stock(product_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.get(Product, product_id)).stock_quantity
+
+
+def test_stock_changes_only_published_when_stock_runs_out_or_returns(
+        add, product_changes
+):
+    product = make_product(stock_quantity=3)
+    add(product)
+
+    run(_reserve({product.id: 2}))
+    assert product_changes == []
+    run(_reserve({product.id: 1}))
+    assert product_changes == [{product.id}]
+    run(_release({product.id: 1}))
+    assert product_changes == [{product.id}, {product.id}]
+    run(_release({product.id: 2}))
+    assert product_changes == [{product.id}, {product.id}]
+    assert run(_stock(product.id)) == 3
+
+
+def test_reserve_stock_short(add, product_changes):
+    product = make_product(stock_quantity=1)
+    add(product)
+
+    with pytest.raises(InsufficientStockError):
+        run(_reserve({product.id: 2}))
+    assert run(_stock(product.id)) == 1
+    assert product_changes == []